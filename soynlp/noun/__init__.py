@@ -2,4 +2,5 @@ from ._noun_ver1 import LRNounExtractor
 from ._noun_news import NewsNounExtractor
 from ._noun_ver2 import LRNounExtractor_v2
 from ._noun_ver2 import NounScore
+from ._noun_ver2 import NounDelta
 from ._josa import extract_domain_pos_features
\ No newline at end of file
@@ -1,10 +1,22 @@
 # -*- encoding:utf8 -*-
 
 from collections import namedtuple
+import numpy as np
+from scipy.sparse import csr_matrix
+from soynlp.hangle import decompose
 from soynlp.utils import check_corpus
 NewsNounScore = namedtuple('NewsNounScore', 'score frequency feature_proportion eojeol_proportion n_positive_feature unique_positive_feature_proportion')
 import sys
 
+# R (first two characters) which josa of noun begins with. It is used in unijosa filter
+_unijosa_passset = {'과', '는', '되고', '되는', '되다', '된다',
+                    '들', '들에', '들의', '들이',
+                    '로', '로는', '로도', '로서', '를',
+                    '부터', '뿐', '뿐만', '뿐이', '뿐인',
+                    '에게', '에도', '에서', '에와', '와',
+                    '으로', '으로의', '은', '의', '이', '이나', '이라', '이었', '인', '임',
+                    '처럼', '하다', '한', '할', '했던', '했고', '했다'}
+
 class NewsNounExtractor:
     
     def __init__(self, max_left_length=10, max_right_length=7,
@@ -86,6 +98,7 @@ class NewsNounExtractor:
         self.lrgraph, self.rlgraph, self.eojeols = self._build_graph(sents)
         self.lcount = {k:sum(d.values()) for k,d in self.lrgraph.items()}
         self.rcount = {k:sum(d.values()) for k,d in self.rlgraph.items()}
+        self._build_l_table()
 
         if self.verbose:
             print('done (Lset, Rset, Eojeol) = ({}, {}, {})'.format(
@@ -115,6 +128,91 @@ class NewsNounExtractor:
                     rlgraph[r][l] += count
         return dictdictize(lrgraph), dictdictize(rlgraph), eojeols
 
+    def _build_l_table(self):
+        """It computes statistics of all L at once from (L, R) frequency matrix.
+        Column i of self._l_table is the statistics of self._idx2l[i]
+
+            frequency : sum of (L, R) frequency
+            eojeol : frequency of L as eojeol
+            norm, weighted_score, n_feature, n_positive_feature : R features of predict
+            score, feature_proportion, eojeol_proportion, unique_positive_feature_proportion : predict
+            n_nonempty_r : frequency of L with nonempty R
+            n_passjosa : frequency of L with R begins with josa of unijosa filter
+            n_h : frequency of L with R begins with 'ㅎ' (하다, 했다, ...)
+            droprate : frequency(L) / frequency(L[:-1]). 0 if L[:-1] does not exist
+        """
+
+        self._idx2l = list(self.lrgraph)
+        self._l_index = {l:i for i, l in enumerate(self._idx2l)}
+
+        rdicts = list(self.lrgraph.values())
+        n_edges = sum(len(rdict) for rdict in rdicts)
+        r2idx = {}
+        indices = np.fromiter((r2idx.setdefault(r, len(r2idx)) for rdict in rdicts for r in rdict),
+            dtype=np.int64, count=n_edges)
+        data = np.fromiter((c for rdict in rdicts for c in rdict.values()),
+            dtype=np.float64, count=n_edges)
+        indptr = np.zeros(len(rdicts) + 1, dtype=np.int64)
+        np.cumsum([len(rdict) for rdict in rdicts], out=indptr[1:])
+        # rows keep the order of R in lrgraph, so the weighted scores are summed in same order with predict
+        matrix = csr_matrix((data, indices, indptr), shape=(len(rdicts), len(r2idx)))
+        exist = csr_matrix((np.ones(n_edges), indices, indptr), shape=matrix.shape)
+
+        def r_vector(func):
+            return np.fromiter((func(r) for r in r2idx), dtype=np.float64, count=len(r2idx))
+
+        first_chars = {r[0] for r in r2idx if r}
+        h_chars = {c for c in first_chars if (decompose(c) or ' ')[0] == 'ㅎ'}
+
+        is_feature = r_vector(lambda r: r in self.r_scores)
+        is_positive = r_vector(lambda r: self.r_scores.get(r, 0) > 0)
+        r_scores = r_vector(lambda r: self.r_scores.get(r, 0))
+        is_nonempty = r_vector(lambda r: len(r) > 0)
+        is_passjosa = r_vector(lambda r: len(r) > 0 and (r[:2] in _unijosa_passset))
+        is_h = r_vector(lambda r: len(r) > 0 and (r[0] in h_chars))
+
+        as_int = lambda x: np.rint(x).astype(np.int64)
+        frequency = as_int(matrix @ np.ones(len(r2idx)))
+        eojeol = np.array([self.eojeols.get(l, 0) for l in self._idx2l], dtype=np.int64)
+        norm = as_int(matrix @ is_feature)
+        weighted_score = matrix @ r_scores
+        n_feature = as_int(exist @ is_feature)
+        n_positive_feature = as_int(exist @ is_positive)
+
+        def divide(a, b):
+            out = np.zeros(a.shape[0], dtype=np.float64)
+            return np.divide(a, b, out=out, where=b > 0)
+
+        parent = np.array([self._l_index.get(l[:-1], -1) for l in self._idx2l], dtype=np.int64)
+        parent_frequency = np.where(parent >= 0, frequency[parent], 0)
+
+        self._l_table = {
+            'frequency': frequency,
+            'eojeol': eojeol,
+            'norm': norm,
+            'weighted_score': weighted_score,
+            'n_feature': n_feature,
+            'n_positive_feature': n_positive_feature,
+            'score': divide(weighted_score, norm),
+            'feature_proportion': divide(norm, frequency - eojeol),
+            'eojeol_proportion': divide(eojeol, frequency),
+            'unique_positive_feature_proportion': divide(n_positive_feature, n_feature),
+            'n_nonempty_r': as_int(matrix @ is_nonempty),
+            'n_passjosa': as_int(matrix @ is_passjosa),
+            'n_h': as_int(matrix @ is_h),
+            'droprate': divide(frequency, parent_frequency)
+        }
+
+    def _l_statistic(self, l, column):
+        i = self._l_index.get(l, -1)
+        return 0 if i < 0 else self._l_table[column].item(i)
+
+    def _eojeol_candidates(self, min_frequency, min_eojeol_proportion):
+        table = self._l_table
+        indices = np.where((table['frequency'] >= min_frequency) &
+            (table['eojeol_proportion'] >= min_eojeol_proportion))[0]
+        return {self._idx2l[i]:c for i, c in zip(indices.tolist(), table['frequency'][indices].tolist())}
+
     def extract(self, min_noun_score=0.4, min_frequency=3,
             noun_candidates=None, min_feature_proportion=0.6):
 
@@ -167,8 +265,7 @@ class NewsNounExtractor:
                     return (l, r)
             return None
 
-        candidates = {l:c for l,c in self.lcount.items()
-            if c >= min_frequency and (self.eojeols.get(l, 0) / c) >= min_eojeol_proportion}
+        candidates = self._eojeol_candidates(min_frequency, min_eojeol_proportion)
 
         for i, (l, c) in enumerate(candidates.items()):
             if self.verbose and (i+1) % 1000 == 0:
@@ -189,8 +286,7 @@ class NewsNounExtractor:
     def _post_eojeol_analysis(self, min_frequency=3,
         min_eojeol_proportion=0.99, min_noun_score=0.4):
 
-        candidates = {l:c for l,c in self.lcount.items()
-            if c >= min_frequency and (self.eojeols.get(l, 0) / c) >= min_eojeol_proportion}
+        candidates = self._eojeol_candidates(min_frequency, min_eojeol_proportion)
 
         begin = len(self.noun_dictionary)
         for i, (l, c) in enumerate(candidates.items()):
@@ -215,25 +311,21 @@ class NewsNounExtractor:
             sys.stdout.write(message.format(len(self.noun_dictionary) - begin))
 
     def predict(self, l):
-        (norm, score, _total, n_positive_feature, n_feature) = (0, 0, 0, 0, 0)
-
-        for r, frequency in self.lrgraph.get(l, {}).items():
-            _total += frequency
-            if not r in self.r_scores:
-                continue
-            norm += frequency
-            score += frequency * self.r_scores[r]
-            n_feature += 1
-            n_positive_feature += 1 if self.r_scores[r] > 0 else 0
-
-        score = score / norm if norm else 0
-        n_eojeol = self.eojeols.get(l, 0)
-        feature_proportion = norm / (_total - n_eojeol) if (_total - n_eojeol) > 0 else 0
-        eojeol_proportion = n_eojeol / _total if _total > 0 else 0
-        unique_positive_feature_proportion = 0 if n_feature <= 0 else n_positive_feature / n_feature
-
-        return NewsNounScore(score, _total, feature_proportion, eojeol_proportion, n_positive_feature, unique_positive_feature_proportion)
-#         return (score, _total, feature_proportion, eojeol_proportion, n_positive_feature, unique_positive_feature_proportion)
+        i = self._l_index.get(l, -1)
+        if i < 0:
+            return NewsNounScore(0, 0, 0, 0, 0, 0)
+        return self._predict_row(i)
+
+    def _predict_row(self, i):
+        table = self._l_table
+        return NewsNounScore(
+            table['score'].item(i),
+            table['frequency'].item(i),
+            table['feature_proportion'].item(i),
+            table['eojeol_proportion'].item(i),
+            table['n_positive_feature'].item(i),
+            table['unique_positive_feature_proportion'].item(i)
+        )
 
     def _postprocessing(self, noun_scores, min_noun_score=0.4,
         min_feature_proportion=0.6):
@@ -301,7 +393,7 @@ class NewsNounExtractor:
         elif self.l_frequency(l) / base  > min_frequency_droprate:
             return False
         tokens = {l+r:c for r, c in self.lrgraph.get(l, {}).items()}
-        prop = sum((c for token, c in tokens.items() if match_NJsubJ(token))) / sum(tokens.values())
+        prop = sum((c for token, c in tokens.items() if match_NJsubJ(token))) / self.l_frequency(l)
         return prop > njsub_proportion_threshold
 
     def _find_NsubJ(self, l, candidate_noun_threshold=0.7, nsubj_proportion_threshold=0.7):
@@ -316,8 +408,7 @@ class NewsNounExtractor:
            is_NVsubE('폭행당') # True """
 
         def eojeol_proportion(w):
-            sum_ = sum(self.lrgraph.get(w, {}).values())
-            return False if not sum_ else (min(1, self.eojeols.get(w, 0) / sum_) > max_eojeol_proportion)
+            return min(1, self._l_statistic(w, 'eojeol_proportion')) > max_eojeol_proportion
 
         r_extensions = self.lrgraph.get(l, {})
         if not r_extensions:
@@ -328,7 +419,7 @@ class NewsNounExtractor:
             (l0, r0) = (l[:-b], l[-b:])
             if not (l0 in self._noun_scores_) or not (l0 in self.noun_dictionary):
                 continue
-            r_extension_as_eojeol = sum([eojeol_proportion(r0+r)*c for r, c in r_extensions.items()]) / sum(r_extensions.values())
+            r_extension_as_eojeol = sum([eojeol_proportion(r0+r)*c for r, c in r_extensions.items()]) / self.l_frequency(l)
             if r_extension_as_eojeol > max_eojeol_proportion:
                 return True
         return False
@@ -374,45 +465,30 @@ class NewsNounExtractor:
         return False
 
     def _hardrule_unijosa_filter(self, l, min_frequency=10, max_num_of_josa=1):
-        def has_passset(r):
-            passset = {'과', '는', '되고', '되는', '되다', '된다', 
-                       '들', '들에', '들의', '들이', 
-                       '로', '로는', '로도', '로서', '를', 
-                       '부터', '뿐', '뿐만', '뿐이', '뿐인', 
-                       '에게', '에도', '에서', '에와', '와', 
-                       '으로', '으로의', '은', '의', '이', '이나', '이라', '이었', '인', '임', 
-                       '처럼', '하다', '한', '할', '했던', '했고', '했다'}        
-            return (r in passset)
-
         if not (l in self._noun_scores_):
             return True
         if self._noun_scores_[l][1] <= min_frequency and self._noun_scores_[l][4] <= max_num_of_josa:
             rdict = self.lrgraph.get(l, {})
             if not rdict:
                 return False
-            n_passjosa = sum((c for r,c in self.lrgraph[l].items() if (r) and (has_passset(r[:2]) or self._is_NJ(r))))
-            n_nonemptyr = sum((c for r, c in self.lrgraph[l].items() if r))
+            # R in passset is counted in table. Only the other R are checked with _is_NJ
+            n_passjosa = self._l_statistic(l, 'n_passjosa') + sum((c for r,c in rdict.items()
+                if (r) and not (r[:2] in _unijosa_passset) and self._is_NJ(r)))
+            n_nonemptyr = self._l_statistic(l, 'n_nonempty_r')
             passset_prop = n_passjosa / n_nonemptyr if n_nonemptyr else 0
             return passset_prop > 0.5
         return True
 
     def _hardrule_dang_hada_filter(self, l, max_h_proportion=0.5):
-        from soynlp.hangle import decompose # TODO check import path
         if not (l[-1] == '당') and (l[:-1] in self._noun_scores_ or l[:-1] in self.noun_dictionary):
             return True
-        rdict = self.lrgraph.get(l, {})
-        n_base = sum((c for r,c in rdict.items() if c))
-        n_h = 0
-        for r,c in rdict.items():
-            if not r: continue
-            rdecompose = decompose(r[0])
-            if rdecompose and rdecompose[0] == 'ㅎ':
-                n_h += c
+        n_base = self.l_frequency(l)
+        n_h = self._l_statistic(l, 'n_h')
         return True if n_base <= 0 else (n_h / n_base < max_h_proportion) 
 
     def _hardrule_suffix_filter(self, l, min_frequency_droprate=0.8):
         def prop_r(l, r):
-            base = sum(self.lrgraph.get(l, {}).values())
+            base = self.l_frequency(l)
             return 0 if base == 0 else self.lrgraph.get(l, {}).get(r, 0) / base
 
         if l in self._vdictionary:
@@ -427,11 +503,11 @@ class NewsNounExtractor:
         if (l[-1] == '없') and ((prop_r(l, '는') + prop_r(l, '이') + prop_r(l, '다')) + prop_r(l, '었다') > 0.5):
             return False
         if (l[-1] == '인') or (l[-1] == '은') or (l[-1] == '의') or (l[-1] == '와') or (l[-1] == '과'):
-            droprate = 0 if not (l[:-1] in self.lcount) else (self.lcount.get(l, 0) / self.lcount[l[:-1]])
+            droprate = self._l_statistic(l, 'droprate')
             if droprate < min_frequency_droprate:
                 return False
         if (l[-2:] == '들이') or (l[-2:] == '들은') or (l[-2:] == '들도') or (l[-2:] == '들을'):
-            droprate = 0 if not (l[:-1] in self.lcount) else (self.lcount.get(l, 0) / self.lcount[l[:-1]])
+            droprate = self._l_statistic(l, 'droprate')
             if droprate < min_frequency_droprate:
                 return False
         if (l[-2:] == '으로') and (len(l) == 3 or (l[:-2] in self.noun_dictionary or l[:-2] in self._noun_scores_postprocessed)):
@@ -1,12 +1,15 @@
 # -*- encoding:utf8 -*-
 
-from collections import defaultdict, namedtuple
+from collections import namedtuple
 import math
+import os
 import sys
 from soynlp.normalizer import normalize_sent_for_lrgraph
 from soynlp.word import WordExtractor
 from soynlp.utils import check_corpus
 from soynlp.utils import LRGraph
+from soynlp.utils import iter_chunks
+from soynlp.utils import map_bounded
 
 NounScore_v1 = namedtuple('NounScore_v1', 'frequency score known_r_ratio')
 
@@ -27,7 +30,6 @@ class LRNounExtractor:
         self.ensure_normalized = ensure_normalized
 
         if not predictor_fnames:
-            import os
             directory = '/'.join(os.path.abspath(__file__).replace('\\', '/').split('/')[:-2])
             predictor_fnames = ['%s/trained_models/noun_predictor_sejong' % directory]
             if verbose:
@@ -62,18 +64,50 @@ class LRNounExtractor:
             print(e)
 
     def train_extract(self, sents, min_noun_score=0.5, min_noun_frequency=5,
-            noun_candidates=None):
+            noun_candidates=None, n_jobs=1, chunk_size=10000):
 
-        self.train(sents, min_noun_frequency)
+        self.train(sents, min_noun_frequency, n_jobs, chunk_size)
         return self.extract(min_noun_score, min_noun_frequency, noun_candidates)
 
-    def train(self, sents, min_noun_frequency=5):
+    def train(self, sents, min_noun_frequency=5, n_jobs=1, chunk_size=10000):
+        """
+        Parameters
+        ----------
+            sents: list-like iterable object which has string
+            min_noun_frequency: int. Minimum frequency of L and R subwords
+            n_jobs: int. Number of worker processes counting eojeols. If n_jobs <= 0, it uses all cores
+            chunk_size: int. Number of sentences sent to worker at once
+
+        It reads corpus only once. Eojeols are counted first, and then
+        L, R subwords and lr-graph are derived from the eojeol counter.
+        """
         check_corpus(sents)
-        wordset_l, wordset_r = self._scan_vocabulary(sents, min_noun_frequency)
-        lrgraph = self._build_lrgraph(sents, wordset_l, wordset_r)
+        eojeols = self._count_eojeols(sents, n_jobs, chunk_size)
+        wordset_l, wordset_r = self._scan_vocabulary_from_eojeols(eojeols, min_noun_frequency)
+        lrgraph = self._build_lrgraph_from_eojeols(eojeols, wordset_l, wordset_r)
         self.lrgraph = LRGraph(lrgraph)
         self.words = wordset_l
 
+    def _count_eojeols(self, sents, n_jobs=1, chunk_size=10000):
+        if n_jobs <= 0:
+            n_jobs = os.cpu_count() or 1
+
+        if n_jobs == 1:
+            eojeols = _count_eojeols_chunk((sents, self.ensure_normalized))
+        else:
+            eojeols = {}
+            args = ((chunk, self.ensure_normalized) for chunk in iter_chunks(sents, chunk_size))
+            for eojeols_ in map_bounded(_count_eojeols_chunk, args, n_jobs):
+                self._merge_eojeols(eojeols, eojeols_)
+
+        if self.verbose:
+            print('\r[Noun Extractor] counting eojeols was done. {} eojeols'.format(len(eojeols)))
+        return eojeols
+
+    def _merge_eojeols(self, eojeols, eojeols_):
+        for eojeol, count in eojeols_.items():
+            eojeols[eojeol] = eojeols.get(eojeol, 0) + count
+
     def _scan_vocabulary(self, sents, min_frequency=5):
         """
         Parameters
@@ -83,24 +117,20 @@ class LRNounExtractor:
         It computes subtoken frequency first. 
         After then, it builds lr-graph with sub-tokens appeared at least min count
         """
+        return self._scan_vocabulary_from_eojeols(self._count_eojeols(sents), min_frequency)
 
-        wordset_l = defaultdict(lambda: 0)
-        wordset_r = defaultdict(lambda: 0)
+    def _scan_vocabulary_from_eojeols(self, eojeols, min_frequency=5):
+        wordset_l = {}
+        wordset_r = {}
 
-        for i, sent in enumerate(sents):
-            if not self.ensure_normalized:
-                sent = normalize_sent_for_lrgraph(sent)
-            for token in sent.split(' '):
-                if not token:
-                    continue
-                token_len = len(token)
-                for i in range(1, min(self.max_left_length, token_len)+1):
-                    wordset_l[token[:i]] += 1
-                for i in range(1, min(self.max_right_length, token_len)):
-                    wordset_r[token[-i:]] += 1
-            if self.verbose and (i % 1000 == 999):
-                message = 'scanning {} / {} sents'.format(i+1, len(sents))
-                print('\r[Noun Extractor] {}'.format(message), end='')
+        for token, count in eojeols.items():
+            token_len = len(token)
+            for i in range(1, min(self.max_left_length, token_len)+1):
+                l = token[:i]
+                wordset_l[l] = wordset_l.get(l, 0) + count
+            for i in range(1, min(self.max_right_length, token_len)):
+                r = token[-i:]
+                wordset_r[r] = wordset_r.get(r, 0) + count
 
         self._substring_counter = {w:f for w,f in wordset_l.items() if f >= min_frequency}
         wordset_l = set(self._substring_counter.keys())
@@ -113,31 +143,28 @@ class LRNounExtractor:
         return wordset_l, wordset_r
 
     def _build_lrgraph(self, sents, wordset_l, wordset_r):
-        lrgraph = defaultdict(lambda: defaultdict(lambda: 0))
+        return self._build_lrgraph_from_eojeols(self._count_eojeols(sents), wordset_l, wordset_r)
+
+    def _build_lrgraph_from_eojeols(self, eojeols, wordset_l, wordset_r):
+        lrgraph = {}
 
-        for i, sent in enumerate(sents):
-            if not self.ensure_normalized:
-                sent = normalize_sent_for_lrgraph(sent)
-            for token in sent.split():
-                if not token:
+        for token, count in eojeols.items():
+            n = len(token)
+            for i in range(1, min(self.max_left_length, n)+1):
+                l = token[:i]
+                r = token[i:]
+                if not (l in wordset_l):
                     continue
-                n = len(token)
-                for i in range(1, min(self.max_left_length, n)+1):
-                    l = token[:i]
-                    r = token[i:]
-                    if not (l in wordset_l):
-                        continue
-                    if (len(r) > 0) and not (r in wordset_r):
-                        continue
-                    lrgraph[l][r] += 1
-
-            if self.verbose and (i % 1000 == 999):
-                message = 'building L-R graph from {} / {} sents'.format(i+1, len(sents))
-                print('\r[Noun Extractor] {}'.format(message), end='')
+                if (len(r) > 0) and not (r in wordset_r):
+                    continue
+                rdict = lrgraph.get(l)
+                if rdict is None:
+                    rdict = {}
+                    lrgraph[l] = rdict
+                rdict[r] = rdict.get(r, 0) + count
 
         if self.verbose:
-            print('\r[Noun Extractor] building L-R graph was done'.format(' '*20))
-        lrgraph = {l:{r:f for r,f in rdict.items()} for l,rdict in lrgraph.items()}
+            print('\r[Noun Extractor] building L-R graph was done')
         return lrgraph
 
     def extract(self, min_noun_score=0.5, min_noun_frequency=5, noun_candidates=None):
@@ -283,3 +310,13 @@ class LRNounExtractor:
             nouns_[word] = NounScore_v1(noun_frequencies[word], score[0], score[1])
 
         return nouns_
+
+def _count_eojeols_chunk(args):
+    sents, ensure_normalized = args
+    eojeols = {}
+    for sent in sents:
+        if not ensure_normalized:
+            sent = normalize_sent_for_lrgraph(sent)
+        for eojeol in sent.split():
+            eojeols[eojeol] = eojeols.get(eojeol, 0) + 1
+    return eojeols
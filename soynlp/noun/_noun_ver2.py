@@ -1,6 +1,14 @@
 from collections import defaultdict
 from collections import namedtuple
+import copy
+import heapq
+from itertools import chain
 import os
+import pickle
+import struct
+
+import numpy as np
+from scipy.sparse import csr_matrix
 
 from soynlp.normalizer import normalize_sent_for_lrgraph
 from soynlp.utils import check_corpus
@@ -8,6 +16,7 @@ from soynlp.utils import check_dirs
 from soynlp.utils import EojeolCounter
 from soynlp.utils import LRGraph
 from soynlp.utils import get_process_memory
+from soynlp.utils import map_bounded
 from soynlp.tokenizer import MaxScoreTokenizer
 from ._josa import extract_domain_pos_features
 from ._noun_postprocessing import detaching_features
@@ -15,13 +24,27 @@ from ._noun_postprocessing import ignore_features
 from ._noun_postprocessing import check_N_is_NJ
 
 NounScore = namedtuple('NounScore', 'frequency score')
+NounDelta = namedtuple('NounDelta', 'added removed updated')
+
+# header of the file written by LRNounExtractor_v2.save. The pickle follows it
+_MAGIC = b'SOYNLPNX'
+_VERSION = 1
+_HEADER = struct.Struct('<8sQ')
+
+# configurations saved with trained state. Runtime settings are not included
+_TRAINING_PARAMETERS = (
+    'max_left_length', 'max_right_length', 'min_num_of_features',
+    'max_frequency_when_noun_is_eojeol', 'eojeol_counter_filtering_checkpoint',
+    'extract_compound', 'extract_pos_feature', 'extract_determiner',
+    'ensure_normalized', 'postprocessing'
+)
 
 class LRNounExtractor_v2:
     def __init__(self, max_left_length=10, max_right_length=9, predictor_headers=None,
         verbose=True, min_num_of_features=1, max_frequency_when_noun_is_eojeol=30,
         eojeol_counter_filtering_checkpoint=500000,
         extract_compound=True, extract_pos_feature=False, extract_determiner=False,
-        ensure_normalized=False, postprocessing=None, logpath=None):
+        ensure_normalized=False, postprocessing=None, logpath=None, n_jobs=1):
 
         self.max_left_length = max_left_length
         self.max_right_length = max_right_length
@@ -35,6 +58,7 @@ class LRNounExtractor_v2:
         self.extract_determiner = extract_determiner
         self.ensure_normalized = ensure_normalized
         self.logpath = logpath
+        self.n_jobs = n_jobs
 
         if logpath:
             check_dirs(logpath)
@@ -101,6 +125,14 @@ class LRNounExtractor_v2:
         self._pos_features = pos
         self._neg_features = neg
         self._common_features = common
+        self._build_feature_tries()
+
+    def _build_feature_tries(self):
+        # features are changed. noun candidates should be found and predicted again
+        self._noun_candidates_cache = None
+        self._prediction_cache = None
+        self._pos_trie = _build_reversed_trie(self._pos_features)
+        self._neg_trie = _build_reversed_trie(self._neg_features)
 
     def _append_features(self, feature_type, features):
 
@@ -129,6 +161,7 @@ class LRNounExtractor_v2:
             raise ValueError('Feature type was wrong. Choice = [pos, neg, common]')
 
         self._common_features.update(commons)
+        self._build_feature_tries()
 
         # size after
         n_pos_, n_neg_, n_common_ = check_feature_size()
@@ -189,6 +222,7 @@ class LRNounExtractor_v2:
     def _train_with_lrgraph(self, lrgraph, num_of_eojeols=-1):
         self.lrgraph = lrgraph
         self._num_of_covered_eojeols = 0
+        self._prediction_cache = None
 
         if num_of_eojeols == -1:
             num_of_eojeols = lrgraph.to_EojeolCounter()._count_sum
@@ -198,6 +232,99 @@ class LRNounExtractor_v2:
             print('[Noun Extractor] has been trained. #eojeols={}, mem={} Gb'.format(
                 num_of_eojeols, '%.3f'%get_process_memory()))
 
+    def save(self, fname):
+        """Save training parameters and trained state: original LR graph, features,
+        prediction scores, extracted nouns and compound components.
+        After load(fname), extract() can be run with other thresholds without training.
+
+        The file is a version header followed by a pickle. Do not load it from
+        untrusted sources, because unpickling can execute arbitrary code"""
+
+        # runtime settings such as verbose, n_jobs and logpath are not saved
+        configuration = {key:getattr(self, key) for key in _TRAINING_PARAMETERS}
+
+        # current lrgraph is recovered from its origin with reset_lrgraph.
+        # _lr and _rl are built again when loading
+        lrgraph = self.lrgraph
+        data = {
+            'lrgraph': None if lrgraph is None else lrgraph._lr_origin,
+            'l_max_length': None if lrgraph is None else lrgraph.l_max_length,
+            'r_max_length': None if lrgraph is None else lrgraph.r_max_length,
+            'num_of_eojeols': getattr(self, '_num_of_eojeols', 0),
+            'num_of_covered_eojeols': getattr(self, '_num_of_covered_eojeols', 0),
+            'pos_features': self._pos_features,
+            'neg_features': self._neg_features,
+            'common_features': self._common_features,
+            'pos_features_extracted': getattr(self, '_pos_features_extracted', None),
+            'prediction': getattr(self, '_prediction_cache', None),
+            'nouns': getattr(self, '_nouns', None),
+            'compound_nouns': (self._compound_decomposer.scores
+                               if hasattr(self, '_compound_decomposer') else None),
+            'compounds_components': getattr(self, '_compounds_components', None)
+        }
+
+        params = {
+            'configuration': configuration,
+            'data': data
+        }
+
+        dirname = os.path.dirname(fname)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname)
+        with open(fname, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION))
+            pickle.dump(params, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def load(self, fname):
+        """Load the file written by save(fname). Training parameters are restored,
+        and runtime settings (verbose, n_jobs, logpath) of this extractor are kept.
+        Do not load the file from untrusted sources, because it is a pickle"""
+
+        with open(fname, 'rb') as f:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise ValueError('{} is not soynlp noun extractor model'.format(fname))
+            magic, version = _HEADER.unpack(header)
+            if magic != _MAGIC:
+                raise ValueError('{} is not soynlp noun extractor model'.format(fname))
+            if version != _VERSION:
+                raise ValueError('Noun extractor model version {} is not supported. Expected {}. Save the model again'.format(
+                    version, _VERSION))
+            params = pickle.load(f)
+
+        configuration = params['configuration']
+        for key in _TRAINING_PARAMETERS:
+            setattr(self, key, configuration[key])
+
+        data = params['data']
+        if data['lrgraph'] is None:
+            self.lrgraph = None
+        else:
+            self.lrgraph = LRGraph(lrgraph=data['lrgraph'],
+                l_max_length=data['l_max_length'], r_max_length=data['r_max_length'])
+        self._num_of_eojeols = data['num_of_eojeols']
+        self._num_of_covered_eojeols = data['num_of_covered_eojeols']
+
+        self._pos_features = data['pos_features']
+        self._neg_features = data['neg_features']
+        self._common_features = data['common_features']
+        self._build_feature_tries()
+        if data['pos_features_extracted'] is not None:
+            self._pos_features_extracted = data['pos_features_extracted']
+
+        # cache is set after _build_feature_tries, which resets it
+        self._prediction_cache = data['prediction']
+        if data['nouns'] is not None:
+            self._nouns = data['nouns']
+        if data['compound_nouns'] is not None:
+            self._compound_decomposer = MaxScoreTokenizer(scores=data['compound_nouns'])
+        if data['compounds_components'] is not None:
+            self._compounds_components = data['compounds_components']
+
+        if self.verbose:
+            print('[Noun Extractor] loaded from {}. #eojeols={}, mem={} Gb'.format(
+                fname, self._num_of_eojeols, '%.3f'%get_process_memory()))
+
     def _extract_determiner(self):
         raise NotImplemented
 
@@ -254,8 +381,118 @@ class LRNounExtractor_v2:
 
             self.extract_domain_pos_features(noun_candidates)
 
+        removals = []
         prediction_scores = self._batch_predicting_nouns(
-            noun_candidates, min_noun_score)
+            noun_candidates, min_noun_score, removals)
+        self._cache_prediction(min_noun_score, prediction_scores, removals)
+
+        return self._extract_from_prediction(prediction_scores,
+            min_noun_score, min_noun_frequency, reset_lrgraph)
+
+    def update(self, inputs, min_noun_score=0.3, min_noun_frequency=1,
+        min_eojeol_frequency=1, reset_lrgraph=True):
+        """Add new sentences to trained extractor and extract nouns again.
+
+        Eojeols of inputs are added to the LR graph in place. Only the noun candidates
+        whose first character begins a new eojeol are predicted again, and the predictions
+        and removals of other characters are reused (see _predict_and_remove). Compounds,
+        postprocessing and coverage are computed again with all predictions.
+        The nouns are same with train_extract of all inputs when min_eojeol_frequency=1.
+
+        Arguments
+        ---------
+        inputs : list of str, DoublespaceLineCorpus or EojeolCounter
+            New sentences
+        min_eojeol_frequency : int
+            It is applied to the eojeols of inputs only
+
+        Returns
+        -------
+        delta : NounDelta
+            added : {noun: NounScore} of new nouns
+            removed : {noun: NounScore} of the nouns which are not extracted anymore. Scores are previous ones
+            updated : {noun: NounScore} of the nouns whose score or frequency is changed
+
+        Usage
+
+            noun_extractor = LRNounExtractor_v2()
+            nouns = noun_extractor.train_extract(sents)
+            delta = noun_extractor.update(new_sents)
+        """
+
+        prev_nouns = getattr(self, '_nouns', None) or {}
+
+        if not self.is_trained:
+            self.train(inputs, min_eojeol_frequency)
+            nouns = self.extract(min_noun_score, min_noun_frequency, reset_lrgraph)
+            return self._noun_delta(prev_nouns, nouns)
+
+        if isinstance(inputs, EojeolCounter):
+            eojeol_counter = inputs
+        else:
+            check_corpus(inputs)
+            eojeol_counter = EojeolCounter(
+                inputs,
+                min_count = min_eojeol_frequency,
+                max_length = self.max_left_length + self.max_right_length,
+                filtering_checkpoint = self.eojeol_counter_filtering_checkpoint,
+                verbose = self.verbose,
+                preprocess = normalize_sent_for_lrgraph if self.ensure_normalized else None
+            )
+
+        self.lrgraph.add_eojeols(eojeol_counter.items())
+        self._num_of_eojeols += eojeol_counter._count_sum
+        changed_chars = {eojeol[0] for eojeol, _ in eojeol_counter.items()}
+
+        if self.verbose:
+            print('[Noun Extractor] {} eojeols were added. predict nouns beginning with {} characters'.format(
+                eojeol_counter._count_sum, len(changed_chars)))
+
+        self.lrgraph.reset_lrgraph()
+        cache = getattr(self, '_prediction_cache', None)
+        if (self.extract_pos_feature or cache is None or cache[0] != min_noun_score):
+            # pos features or min_noun_score may be changed. all candidates are predicted again
+            nouns = self.extract(min_noun_score, min_noun_frequency, reset_lrgraph)
+            return self._noun_delta(prev_nouns, nouns)
+
+        self._num_of_covered_eojeols = 0
+        _, prev_scores, prev_removals = cache
+        noun_candidates = self._noun_candidates_from_positive_features()
+
+        # removals of unchanged characters are same with previous prediction
+        removals = [removal for char, removals_ in prev_removals.items()
+                    if not (char in changed_chars) for removal in removals_]
+        self.lrgraph.remove_eojeols(removals)
+
+        changed_candidates = {word:count for word, count in noun_candidates.items()
+                              if word[0] in changed_chars}
+        scores = self._batch_predicting_nouns(changed_candidates, min_noun_score, removals)
+
+        # same order with batch prediction of all candidates
+        prediction_scores = {word:(scores[word] if word in scores else prev_scores[word])
+            for word in sorted(noun_candidates, key=lambda x:-len(x))}
+        self._cache_prediction(min_noun_score, prediction_scores, removals)
+
+        nouns = self._extract_from_prediction(prediction_scores,
+            min_noun_score, min_noun_frequency, reset_lrgraph)
+        return self._noun_delta(prev_nouns, nouns)
+
+    def _cache_prediction(self, min_noun_score, prediction_scores, removals):
+        removals_ = {}
+        for eojeol, count in removals:
+            removals_.setdefault(eojeol[0], []).append((eojeol, count))
+        self._prediction_cache = (min_noun_score, prediction_scores, removals_)
+
+    def _noun_delta(self, prev_nouns, nouns):
+        prev_nouns = {noun:NounScore(score[0], score[1]) for noun, score in prev_nouns.items()}
+        added = {noun:score for noun, score in nouns.items() if not (noun in prev_nouns)}
+        removed = {noun:score for noun, score in prev_nouns.items() if not (noun in nouns)}
+        updated = {noun:score for noun, score in nouns.items()
+                   if (noun in prev_nouns) and (prev_nouns[noun] != score)}
+        return NounDelta(added, removed, updated)
+
+    def _extract_from_prediction(self, prediction_scores,
+        min_noun_score, min_noun_frequency, reset_lrgraph):
 
         if self.logpath:
             with open(self.logpath+'_prediction_score.log', 'w', encoding='utf-8') as f:
@@ -289,16 +526,16 @@ class LRNounExtractor_v2:
         if self.verbose:
             print('[Noun Extractor] {} nouns ({} compounds) with min frequency={}'.format(
                 len(nouns), len(compounds), min_noun_frequency), flush=True)
-            print('[Noun Extractor] flushing ... ', flush=True, end='')
 
-        self._check_covered_eojeols(nouns)
+        covered_eojeols = self._check_covered_eojeols(nouns)
 
         self._nouns = nouns
 
-        if reset_lrgraph:
+        self.lrgraph.reset_lrgraph()
+        if not reset_lrgraph:
             # when extracting predicates, do not reset lrgraph.
             # the remained lrgraph is predicate (stem - ending) graph
-            self.lrgraph.reset_lrgraph()
+            self.lrgraph.remove_eojeols(covered_eojeols.items())
 
         nouns_ = {noun:NounScore(score[0], score[1]) for noun, score in nouns.items()}
         return nouns_
@@ -309,16 +546,10 @@ class LRNounExtractor_v2:
             ( (r in self._neg_features) and (not self._exist_longer_neg(word, r)) ) )]
 
     def _exist_longer_pos(self, word, r):
-        for e in range(len(word)-1, -1, -1):
-            if (word[e:]+r) in self._pos_features:
-                return True
-        return False
+        return _exist_longer_feature(self._pos_trie, word, r)
 
     def _exist_longer_neg(self, word, r):
-        for e in range(len(word)-1, -1, -1):
-            if (word[e:]+r) in self._neg_features:
-                return True
-        return False
+        return _exist_longer_feature(self._neg_trie, word, r)
 
     def predict(self, word, min_noun_score=0.3, debug=False):
 
@@ -406,64 +637,231 @@ class LRNounExtractor_v2:
         return pos, common, neg, unk, end
 
     def _noun_candidates_from_positive_features(self, condition=None):
-
-        def satisfy(word, e):
-            return word[:e] == condition
+        """It returns {L: sum of counts of (L, positive feature)}.
+        The candidates are cached until lrgraph or features are changed"""
+
+        # candidates filtering for debugging
+        # condition is first chars in L
+        if condition:
+            return {l:c for l, c in self._noun_candidates_from_positive_features().items()
+                    if l[:len(condition)] == condition}
+
+        # lrgraph loaded from old pickle has no version
+        version = getattr(self.lrgraph, '_version', None)
+        cache = getattr(self, '_noun_candidates_cache', None)
+        if (version is not None and cache is not None and
+            cache[0] is self.lrgraph and cache[1] == version):
+            return dict(cache[2])
 
         # noun candidates from positive featuers such as Josa
         N_from_J = {}
-
+        rl = self.lrgraph._rl
         for r in self._pos_features:
-            for l, c in self.lrgraph.get_l(r, -1):
+            ldict = rl.get(r)
+            if not ldict:
+                continue
+            for l, c in ldict.items():
+                N_from_J[l] = N_from_J.get(l,0) + c
 
-                # candidates filtering for debugging
-                # condition is first chars in L
-                if not condition:
-                    N_from_J[l] = N_from_J.get(l,0) + c
-                    continue
+        if version is not None:
+            self._noun_candidates_cache = (self.lrgraph, version, N_from_J)
+        return dict(N_from_J)
 
-                # for debugging
-                if not satisfy(l, len(condition)):
-                    continue
+    def _batch_predicting_nouns(self,
+        noun_candidates, min_noun_score=0.3, removals=None):
 
-                N_from_J[l] = N_from_J.get(l,0) + c
+        n_jobs = self.n_jobs if self.n_jobs > 0 else (os.cpu_count() or 1)
+        if n_jobs > 1:
+            return self._parallel_batch_predicting_nouns(
+                noun_candidates, min_noun_score, n_jobs, removals)
 
-        return N_from_J
+        words = sorted(noun_candidates, key=lambda x:-len(x))
+        prediction_scores = self._predict_and_remove(words, min_noun_score, removals)
 
-    def _batch_predicting_nouns(self,
-        noun_candidates, min_noun_score=0.3):
+        if self.verbose:
+            print('\r[Noun Extractor] batch prediction was completed for {} words'.format(
+                len(words)), flush=True)
 
-        prediction_scores = {}
+        return prediction_scores
 
-        n = len(noun_candidates)
-        for i, word in enumerate(sorted(noun_candidates, key=lambda x:-len(x))):
+    def _predict_and_remove(self, words, min_noun_score, removals=None):
+        """words should be sorted by length in decreasing order.
 
-            if self.verbose and i % 1000 == 999:
-                percentage = '%.3f' % (100 * (i+1) / n)
-                print('\r  -- batch prediction {} % of {} words'.format(
-                    percentage, n), flush=True, end='')
+        Removing eojeol (word + r) changes only the R of the prefixes of (word + r),
+        and the prefixes begin with word[0]. So the words of same length never change
+        the prediction of each other, and neither do the words of different first characters.
+        The words of same length are scored at once with _score_candidates, and then
+        their eojeols are removed. Parallel prediction and update rely on the first
+        character independence.
+        If removals is list, removed (eojeol, count) are appended"""
+
+        prediction_scores = {}
 
-            # base prediction
-            support, score = self.predict(word, min_noun_score)
-            prediction_scores[word] = (support, score)
+        n = len(words)
+        b = 0
+        while b < n:
+            e = b
+            while e < n and len(words[e]) == len(words[b]):
+                e += 1
+            group = words[b:e]
 
-            # if their score is higher than min_noun_score,
-            # remove eojeol pattern from lrgraph
-            if score >= min_noun_score:
+            for word, (support, score) in zip(group, self._score_candidates(group, min_noun_score)):
+                prediction_scores[word] = (support, score)
+
+                # if their score is higher than min_noun_score,
+                # remove eojeol pattern from lrgraph
+                if score < min_noun_score:
+                    continue
                 for r, count in self.lrgraph.get_r(word, -1):
                     # remove all eojeols that including word at left-side.
                     # we have to assume that pos, neg features are incomplete
                     self.lrgraph.remove_eojeol(word+r, count)
-                    # if (r == '' or
-                    #    (r in self._pos_features) or
-                    #    (r in self._common_features)):
-                    #    self.lrgraph.remove_eojeol(word+r, count)
+                    if removals is not None:
+                        removals.append((word+r, count))
+
+            b = e
+            if self.verbose:
+                percentage = '%.3f' % (100 * b / n)
+                print('\r  -- batch prediction {} % of {} words'.format(
+                    percentage, n), flush=True, end='')
+
+        return prediction_scores
+
+    def _score_candidates(self, words, min_noun_score=0.3):
+        """Same with [self.predict(word, min_noun_score) for word in words].
+
+        (L, R) counts of words are stored in CSR matrix, and pos, common, neg, unk
+        and end sums of all words are computed with one product of the matrix and
+        R-side indicators. Only the (L, R) pairs whose R is a suffix of longer
+        feature and whose L ends with the previous character of the feature are
+        checked with the feature tries. Exception rules are also applied with arrays."""
+
+        n = len(words)
+        if n == 0:
+            return []
+
+        rdicts = [self.lrgraph._lr.get(word, {}) for word in words]
+        lengths = np.fromiter(map(len, rdicts), dtype=np.int64, count=n)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        nnz = int(indptr[-1])
+        rs = list(chain.from_iterable(rdicts))
+        rlist = list(dict.fromkeys(rs))
+        r_index = {r:j for j, r in enumerate(rlist)}
+        cols = np.fromiter(map(r_index.__getitem__, rs), dtype=np.int64, count=nnz)
+        data = np.fromiter(chain.from_iterable(map(dict.values, rdicts)), dtype=np.int64, count=nnz)
+        rows = np.repeat(np.arange(n), lengths)
+
+        m = len(rlist)
+        is_end = np.fromiter((r == '' for r in rlist), dtype=bool, count=m)
+        in_pos = np.fromiter((r in self._pos_features for r in rlist), dtype=bool, count=m)
+        in_neg = np.fromiter((r in self._neg_features for r in rlist), dtype=bool, count=m)
+        in_common = np.fromiter((r in self._common_features for r in rlist), dtype=bool, count=m)
+
+        # exist longer pos / neg of each (L, R) pair
+        elp = np.zeros(nnz, dtype=bool)
+        eln = np.zeros(nnz, dtype=bool)
+        last_chars = np.fromiter((ord(word[-1]) for word in words), dtype=np.int64, count=n)[rows]
+        for trie, checked, exist in [(self._pos_trie, ~is_end | in_pos, elp),
+                                     (self._neg_trie, ~is_end | in_neg, eln)]:
+            keys = [j * 0x110000 + ord(char) for j, r in enumerate(rlist)
+                    if checked[j] for char in trie.get(r, ()) if char]
+            if not keys:
+                continue
+            idx = np.nonzero(np.isin(cols * 0x110000 + last_chars, keys))[0]
+            exist[idx] = [_exist_longer_feature(trie, words[i], rlist[j])
+                          for i, j in zip(rows[idx].tolist(), cols[idx].tolist())]
+
+        # R indicators of pos, common, neg, unk, end
+        r_type = np.where(is_end, 4, np.where(in_common, 1, np.where(in_pos, 0, np.where(in_neg, 2, 3))))
+        indicators = np.zeros((m, 5), dtype=np.int64)
+        indicators[np.arange(m), r_type] = 1
+        ignored = (elp | eln) & ~is_end[cols]
+        counts = csr_matrix((np.where(ignored, 0, data), cols, indptr), shape=(n, m))
+        pos, common, neg, unk, end = (counts @ indicators).T
+
+        base = pos + neg
+        int_zero = base == 0
+        score = np.zeros(n)
+        np.divide(pos - neg, base, out=score, where=~int_zero)
+        support = np.where(score >= min_noun_score, pos + end + common, neg + end + common)
+
+        # exception rules for words which have few nonempty features
+        nonempty = (in_pos[cols] & ~elp) | (in_neg[cols] & ~eln)
+        n_features = np.bincount(rows[nonempty], minlength=n)
+        exception = n_features <= self.min_num_of_features
+
+        sum_ = pos + common + neg + unk + end
+        no_feature = exception & (sum_ == 0)
+        frequent = exception & ~no_feature & (end > self.max_frequency_when_noun_is_eojeol) & (pos >= neg)
+        rest = exception & ~no_feature & ~frequent
+        end_ratio = np.zeros(n)
+        np.divide(end, sum_, out=end_ratio, where=sum_ > 0)
+        eojeol = rest & ((common > 0) | (pos > 0)) & (end_ratio >= 0.3) & (common >= neg)
+
+        # number of first characters of R, except R which is suffix of longer pos feature
+        in_pos_or_common = (in_pos | in_common)[cols]
+        first_chars = np.fromiter((ord(r[0]) if r else 0 for r in rlist), dtype=np.int64, count=m)
+        checked = ~is_end[cols] & ~(in_pos_or_common & elp)
+        keys = np.unique(rows[checked] * 0x110000 + first_chars[cols[checked]])
+        n_first_chars = np.bincount(keys // 0x110000, minlength=n)
+        various = rest & ~eojeol & (n_first_chars >= 2)
+
+        noun_like = eojeol | various
+        support = np.where(noun_like, pos + common + end, support)
+        np.divide(support, sum_, out=score, where=noun_like)
+        zero = no_feature | (rest & ~noun_like)
+        score[zero] = 0
+        int_zero = (int_zero & ~noun_like) | zero
+
+        return [(support_, 0 if int_zero_ else score_) for support_, score_, int_zero_ in
+                zip(support.tolist(), score.tolist(), int_zero.tolist())]
+
+    def _parallel_batch_predicting_nouns(self,
+        noun_candidates, min_noun_score, n_jobs, removals=None):
+
+        # the candidates grouped by first character never interact (see _predict_and_remove),
+        # so each group is predicted longest first in worker process with its own part of lrgraph.
+        # Applying the removals in the group order makes same lrgraph with serial prediction.
+        words = sorted(noun_candidates, key=lambda x:-len(x))
+        shards = _shard_by_first_char(words, 4 * n_jobs)
+        shard_of = {word[0]:i for i, shard in enumerate(shards) for word in shard}
+        lr_shards = [{} for _ in shards]
+        for l, rdict in self.lrgraph._lr.items():
+            i = shard_of.get(l[0], -1)
+            if i >= 0:
+                lr_shards[i][l] = rdict
+
+        # lrgraph is not copied to workers. Each worker receives only its shards
+        predictor = copy.copy(self)
+        predictor.lrgraph = None
+        predictor._noun_candidates_cache = None
+        predictor._prediction_cache = None
+        predictor.verbose = False
+
+        scores = {}
+        n, n_done = len(words), 0
+        args = ((lr, shard, min_noun_score) for lr, shard in zip(lr_shards, shards))
+        for result in map_bounded(_predict_shard, args, n_jobs, _initialize_worker, (predictor,)):
+            n_done += self._apply_predicted_shard(result, scores, removals)
+            if self.verbose:
+                print('\r  -- batch prediction {} % of {} words'.format(
+                    '%.3f' % (100 * n_done / n), n), flush=True, end='')
 
         if self.verbose:
             print('\r[Noun Extractor] batch prediction was completed for {} words'.format(
                 n), flush=True)
 
-        return prediction_scores
+        # same order with serial prediction
+        return {word:scores[word] for word in words}
+
+    def _apply_predicted_shard(self, result, scores, removals=None):
+        scores_, removals_ = result
+        scores.update(scores_)
+        self.lrgraph.remove_eojeols(removals_)
+        if removals is not None:
+            removals.extend(removals_)
+        return len(scores_)
 
     def extract_compounds(self, candidates, prediction_scores, min_noun_score=0.3):
 
@@ -475,19 +873,21 @@ class LRNounExtractor_v2:
         candidates = {l:rdict.get('', 0) for l,rdict in self.lrgraph._lr_origin.items()
             if (len(l) >= 4) and not (l in noun_scores)}
 
-        n = len(candidates)
+        # same decomposition with self.decompose_compound for all candidates
+        candidates_parts = _find_compounds(candidates, noun_scores,
+            self._pos_features, self._compound_decomposer._max_length)
+
+        if self.verbose:
+            print('\r  -- check compound 100.00 %', flush=True, end='')
+
         compounds_scores = {}
         compounds_counts = {}
         compounds_components = {}
+        removals = []
 
-        for i, (word, count) in enumerate(sorted(candidates.items(), key=lambda x:-len(x[0]))):
-
-            if self.verbose and i % 1000 == 999:
-                percentage = '%.2f' % (100 * i / n)
-                print('\r  -- check compound {} %'.format(percentage), flush=True, end='')
+        for word, count in sorted(candidates.items(), key=lambda x:-len(x[0])):
 
-            tokens = self._compound_decomposer.tokenize(word, flatten=False)[0]
-            compound_parts = self._parse_compound(tokens)
+            compound_parts = candidates_parts.get(word)
 
             if compound_parts:
 
@@ -500,17 +900,10 @@ class LRNounExtractor_v2:
                 compounds_scores[noun] = max(compounds_scores.get(noun,0), compound_score)
                 compounds_counts[noun] = compounds_counts.get(noun,0) + count
 
-                # reduce frequency of substrings
-                for e in range(2, len(word)):
-                    subword = word[:e]
-
-                    if not subword in candidates:
-                        continue
-
-                    candidates[subword] = candidates.get(subword, 0) - count
-
                 # eojeol coverage
-                self.lrgraph.remove_eojeol(word)
+                removals.append((word, 1))
+
+        self.lrgraph.remove_eojeols(removals)
 
         if self.verbose:
             print('\r[Noun Extractor] checked compounds. discovered {} compounds'.format(
@@ -595,40 +988,183 @@ class LRNounExtractor_v2:
         return nouns
 
     def _check_covered_eojeols(self, nouns):
+        """It counts the eojeols covered by nouns, as if the nouns in noun candidates
+        remove their eojeols from original lrgraph in order of length.
+        Every split of an eojeol has same count, so the count of (L, R) is the original
+        count minus the removed count of eojeol (L + R). Only the R of nouns are read,
+        and lrgraph is not changed.
+
+        It returns {eojeol: removed count}"""
+
+        origin = self.lrgraph._lr_origin
+        pos_features = self._pos_features
+
+        # nouns which are noun candidates from positive features
+        words = [word for word in nouns
+                 if any(r and r in pos_features for r in origin.get(word, ()))]
+
+        removed = {}
+        covered = 0
+        for word in sorted(words, key=lambda x:-len(x)):
+            for r, count in origin[word].items():
+                # a syllable noun is exception; remove only N + pos feature
+                if len(word) == 1 and not (r == '' or
+                    (r in pos_features) or (r in self._common_features)):
+                    continue
+                # remove all eojeols that including word at left-side.
+                # we have to assume that pos, neg features are incomplete
+                eojeol = word + r
+                count -= removed.get(eojeol, 0)
+                if count <= 0:
+                    continue
+                removed[eojeol] = removed.get(eojeol, 0) + count
+                covered += count
 
-        self.lrgraph.reset_lrgraph()
-
-        noun_candidates = self._noun_candidates_from_positive_features()
-
-        n = len(noun_candidates)
-        for i, word in enumerate(sorted(noun_candidates, key=lambda x:-len(x))):
-
-            if self.verbose and i % 1000 == 999:
-                percentage = '%.3f' % (100 * (i+1) / n)
-                print('\r[Noun Extractor] flushing ...  {} %'.format(
-                    percentage), flush=True, end='')
-
-            if not (word in nouns):
-                continue
-
-            for r, count in self.lrgraph.get_r(word, -1):
-                if len(word) > 1:
-                    # remove all eojeols that including word at left-side.
-                    # we have to assume that pos, neg features are incomplete
-                    self.lrgraph.remove_eojeol(word+r, count)
-                    self._num_of_covered_eojeols += count
-                else:
-                    # a syllable noun is exception; remove only N + pos feature
-                    if (r == '' or
-                       (r in self._pos_features) or
-                       (r in self._common_features)):
-                        self.lrgraph.remove_eojeol(word+r, count)
-                        self._num_of_covered_eojeols += count
-
+        self._num_of_covered_eojeols += covered
 
         if self.verbose:
-            print('\r[Noun Extractor] flushing was done. mem={} Gb{}'.format(
-                '%.3f' % get_process_memory(), ' '*20), flush=True)
             coverage = '%.2f' % (100 * self._num_of_covered_eojeols
                 / self._num_of_eojeols)
-            print('[Noun Extractor] {} % eojeols are covered'.format(coverage), flush=True)
\ No newline at end of file
+            print('[Noun Extractor] {} % eojeols are covered'.format(coverage), flush=True)
+
+        return removed
+
+def _build_reversed_trie(features):
+    """It returns {suffix: node} of reversed character trie of features.
+    node is {previous char: node}, and node[''] exists if suffix is a feature"""
+    root = {}
+    nodes = {'': root}
+    for feature in features:
+        node = root
+        for b in range(len(feature)-1, -1, -1):
+            node = node.setdefault(feature[b], {})
+            nodes[feature[b:]] = node
+        node[''] = True
+    return nodes
+
+def _exist_longer_feature(nodes, word, r):
+    """Same with any((word[e:]+r) in features for e in range(len(word))).
+    It walks backward over word from the node of r, without building strings"""
+    node = nodes.get(r)
+    if node is None:
+        return False
+    for b in range(len(word)-1, -1, -1):
+        node = node.get(word[b])
+        if node is None:
+            return False
+        if '' in node:
+            return True
+    return False
+
+def _find_compounds(words, nouns, pos_features, max_length=10):
+    """It returns {word: compound parts} of compound words. The parts are same with
+    MaxScoreTokenizer(scores={noun: len(noun)}, max_length) + _parse_compound.
+
+    Nouns are found with reversed noun trie at each end position. Words are
+    visited in sorted order, so the words sharing prefix share the noun matches
+    of the prefix, and only the matches ending at new characters are found"""
+
+    root = {}
+    for noun in nouns:
+        if len(noun) > max_length:
+            continue
+        node = root
+        for char in reversed(noun):
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    compounds = {}
+    # matches[e-1] is list of noun (begin, end) in prefix of length e
+    matches = []
+    prev = ''
+    for word in sorted(words):
+        n_common = 0
+        for c1, c2 in zip(prev, word):
+            if c1 != c2:
+                break
+            n_common += 1
+        del matches[n_common:]
+        for e in range(n_common + 1, len(word) + 1):
+            matches_ = list(matches[-1]) if matches else []
+            node = root
+            for b in range(e - 1, max(e - max_length, 0) - 1, -1):
+                node = node.get(word[b])
+                if node is None:
+                    break
+                if '' in node:
+                    matches_.append((b, e))
+            matches.append(matches_)
+        prev = word
+
+        parts = _parse_noun_matches(word, matches[-1] if matches else [], pos_features)
+        if parts:
+            compounds[word] = parts
+    return compounds
+
+def _parse_noun_matches(word, matches, pos_features):
+    # same with MaxScoreTokenizer: longer noun first, and then left one first
+    if len(word) <= 2:
+        return None
+    selected = []
+    used = 0
+    for b, e in sorted(matches, key=lambda x:(x[0] - x[1], x[0])):
+        mask = ((1 << (e - b)) - 1) << b
+        if used & mask:
+            continue
+        used |= mask
+        selected.append((b, e))
+    selected.sort()
+
+    # Noun* or Noun*Josa. Gap between nouns is a non-noun token
+    parts = []
+    end = 0
+    for b, e in selected:
+        if b > end:
+            return None
+        parts.append(word[b:e])
+        end = e
+
+    # Noun* + Josa
+    if end < len(word):
+        if len(parts) >= 2 and word[end:] in pos_features:
+            return tuple(parts)
+        return None
+    if len(parts) >= 3 and parts[-1] in pos_features:
+        return tuple(parts[:-1])
+    return tuple(parts)
+
+# noun extractor of worker process. It is set only once by _initialize_worker
+_worker_predictor = None
+
+def _initialize_worker(predictor):
+    global _worker_predictor
+    _worker_predictor = predictor
+
+def _shard_by_first_char(words, n_shards):
+    # The largest first character group goes to the smallest shard.
+    # Words keep their order in each shard
+    groups = {}
+    for word in words:
+        groups.setdefault(word[0], []).append(word)
+    n_shards = max(1, min(n_shards, len(groups)))
+    heap = [(0, i) for i in range(n_shards)]
+    shard_of = {}
+    for char, group in sorted(groups.items(), key=lambda x:-len(x[1])):
+        size, i = heapq.heappop(heap)
+        shard_of[char] = i
+        heapq.heappush(heap, (size + len(group), i))
+    shards = [[] for _ in range(n_shards)]
+    for word in words:
+        shards[shard_of[word[0]]].append(word)
+    return [shard for shard in shards if shard]
+
+def _predict_shard(args):
+    lr, words, min_noun_score = args
+    lrgraph = LRGraph()
+    lrgraph._lr = lr
+    predictor = _worker_predictor
+    predictor.lrgraph = lrgraph
+    removals = []
+    scores = predictor._predict_and_remove(words, min_noun_score, removals)
+    predictor.lrgraph = None
+    return scores, removals
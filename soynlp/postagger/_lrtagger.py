@@ -5,6 +5,7 @@ from collections import namedtuple
 from math import log
 
 from soynlp.tokenizer import MaxScoreTokenizer
+from soynlp.utils import NormalizedLRGraph
 from ._dictionary import Dictionary
 
 default_profile= OrderedDict([
@@ -107,15 +108,10 @@ class LRMaxScoreTagger:
     def _initialize_scores(self, lrgraph):
         def to_counter(dd):
             return {k:sum(d.values()) for k,d in dd.items()}
-        def to_normalized_graph(dd):
-            normed = {}
-            for k,d in dd.items():
-                sum_ = sum(d.values())
-                normed[k] = {k1:c/sum_ for k1,c in d.items()}
-            return normed
 
-        lrgraph_norm = to_normalized_graph(lrgraph)
         lcount = to_counter(lrgraph)
+        # P(R|L) is computed on demand with lcount as sum of R counts
+        lrgraph_norm = NormalizedLRGraph(lrgraph, lcount)
         cohesion_l = {w:pow(c/lcount[w[0]], 1/(len(w)-1)) for w, c in lcount.items() if len(w) > 1}
         droprate_l = {w:c/lcount[w[:-1]] for w, c in lcount.items() if len(w) > 1 and w[:-1] in lcount}
         
@@ -187,7 +183,7 @@ class LRMaxScoreTagger:
             for len_r in range(min(self.dictionary._rmax, n-e)+1):
 
                 r = t[e:e+len_r]
-                lr_prop = self.lrgraph_norm.get(l, {}).get(r, 0)
+                lr_prop = self.lrgraph_norm.prob(l, r)
                 lr_count = self.lrgraph.get(l, {}).get(r, 0)
 
                 if (r) and ((lr_prop <= threshold_prop) or (lr_count <= threshold_count)):
@@ -258,7 +254,7 @@ class LRMaxScoreTagger:
 
     def _infer_subword_information(self, subword):
         pos = self.dictionary.pos_L(subword)
-        prop = self.lrgraph_norm.get(subword, {}).get('', 0.0)
+        prop = self.lrgraph_norm.prob(subword, '', 0.0)
         count = self.lrgraph.get(subword, {}).get('', 0)    
         if not pos:
             pos = self.dictionary.pos_R(subword)
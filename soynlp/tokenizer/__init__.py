@@ -4,4 +4,9 @@ from ._tokenizer import MaxLRScoreTokenizer
 from ._tokenizer import RegexTokenizer
 from ._normalizer import normalize
 from ._noun_tokenizer import NounLMatchTokenizer
-from ._noun_tokenizer import NounMatchTokenizer
\ No newline at end of file
+from ._noun_tokenizer import NounMatchTokenizer
+from ._corpus import tokenize_corpus
+from ._compiled import CompiledScoreTable
+from ._model import load_tokenizer
+from ._server import TokenizerServer
+from ._server import TokenizerClient
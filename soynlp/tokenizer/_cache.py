@@ -0,0 +1,78 @@
+from collections import namedtuple
+from collections import OrderedDict
+import threading
+
+CacheInfo = namedtuple('CacheInfo', 'hits misses max_size size')
+
+
+class EojeolCache:
+    """Bounded LRU cache of eojeol tokenization results.
+
+    Tokenizers store results as tuples, so cached values are never mutated.
+    All operations are guarded with a lock and the cache can be shared by threads.
+
+    Usage
+
+        cache = EojeolCache(max_size=100000)
+        tokens = cache.get_or_compute(eojeol, tokenize_eojeol, eojeol)
+        cache.info()
+        $ CacheInfo(hits=0, misses=1, max_size=100000, size=1)
+    """
+
+    def __init__(self, max_size=100000):
+        if max_size <= 0:
+            raise ValueError('max_size should be positive integer, not {}'.format(max_size))
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        # it is increased by clear(). Results computed before clear() are not stored
+        self._generation = 0
+
+    def __getstate__(self):
+        # lock cannot be pickled. cached items are not shipped to worker processes
+        return {'max_size': self.max_size}
+
+    def __setstate__(self, state):
+        self.__init__(state['max_size'])
+
+    def __len__(self):
+        return len(self._cache)
+
+    def __contains__(self, key):
+        return key in self._cache
+
+    def get_or_compute(self, key, func, *args):
+        with self._lock:
+            value = self._cache.get(key, None)
+            if value is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+            generation = self._generation
+
+        # compute outside of lock. Two threads may compute same eojeol but it is harmless
+        value = func(*args)
+
+        with self._lock:
+            # scores may be changed during computation. Stale result is not stored
+            if generation != self._generation:
+                return value
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._generation += 1
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.max_size, len(self._cache))
@@ -0,0 +1,282 @@
+from array import array
+import mmap
+import os
+import struct
+import sys
+from zlib import crc32
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # Python < 3.8
+    shared_memory = None
+
+try:
+    from multiprocessing import resource_tracker
+except ImportError:
+    # Windows or Python < 3.8
+    resource_tracker = None
+
+
+_MAGIC = b'SOYNLPCS'
+_VERSION = 1
+# magic, version, number of words, number of hash slots, size of word blob
+_HEADER = struct.Struct('<8sQQQQ')
+
+
+class CompiledScoreTable:
+    """Read-only {word: score} table stored in one flat buffer.
+
+    Layout (little endian)
+
+        header  : magic, version, n words, n slots, blob size
+        offsets : int64 array of length n + 1. Word i is blob[offsets[i]:offsets[i+1]]
+        scores  : float64 array of length n
+        slots   : int64 open addressing hash table (crc32 of utf-8 word). -1 is empty
+        blob    : utf-8 encoded words sorted by bytes
+
+    The buffer can be placed in multiprocessing.shared_memory or a mmap file,
+    so worker processes share one physical copy. A table backed by shared memory
+    or file is pickled by its name or path, not by its contents.
+    It has dict-like get, __getitem__ and __contains__, so it can be used as scores
+    of LTokenizer, MaxScoreTokenizer and NounMatchTokenizer.
+
+    Usage
+
+        table = CompiledScoreTable.from_dict({'데이터':0.4, '데이':0.35})
+        shared = table.to_shared_memory()
+        tokenizer = MaxScoreTokenizer(scores=shared)
+        # when it is not used anymore
+        shared.unlink()
+
+        table.save('scores.bin')
+        tokenizer = MaxScoreTokenizer(scores=CompiledScoreTable.load('scores.bin'))
+    """
+
+    def __init__(self, buffer):
+        self._shm = None
+        self._mmap = None
+        self._path = None
+        self._offset = 0
+        self._set_buffer(buffer)
+
+    def _set_buffer(self, buffer):
+        if sys.byteorder != 'little':
+            raise RuntimeError('CompiledScoreTable supports only little endian machines')
+        buf = memoryview(buffer)
+        if len(buf) < _HEADER.size:
+            raise ValueError('Buffer is too small to be CompiledScoreTable')
+        magic, version, n, n_slots, blob_size = _HEADER.unpack_from(buf, 0)
+        if magic != _MAGIC:
+            raise ValueError('Buffer is not CompiledScoreTable')
+        if version != _VERSION:
+            raise ValueError('CompiledScoreTable version {} is not supported. Expected {}'.format(
+                version, _VERSION))
+
+        b = _HEADER.size
+        e = b + 8 * (n + 1)
+        self._offsets = buf[b:e].cast('q')
+        b, e = e, e + 8 * n
+        self._scores = buf[b:e].cast('d')
+        b, e = e, e + 8 * n_slots
+        self._slots = buf[b:e].cast('q')
+        self._blob = buf[e:e+blob_size]
+        # buffer may be longer than the table, e.g. page aligned shared memory or model file
+        self._buf = buf[:e+blob_size]
+        self._n = n
+        self._mask = n_slots - 1
+
+    @classmethod
+    def from_dict(cls, scores):
+        """scores : dict of {str: float}"""
+        return cls(cls._compile(scores))
+
+    @staticmethod
+    def _compile(scores):
+        items = sorted((word.encode('utf-8'), float(score)) for word, score in scores.items())
+        n = len(items)
+
+        # load factor <= 0.5
+        n_slots = 1
+        while n_slots < 2 * n:
+            n_slots *= 2
+
+        offsets = [0]
+        for word, _ in items:
+            offsets.append(offsets[-1] + len(word))
+
+        slots = [-1] * n_slots
+        mask = n_slots - 1
+        for i, (word, _) in enumerate(items):
+            slot = crc32(word) & mask
+            while slots[slot] != -1:
+                slot = (slot + 1) & mask
+            slots[slot] = i
+
+        blob = b''.join(word for word, _ in items)
+        return b''.join([
+            _HEADER.pack(_MAGIC, _VERSION, n, n_slots, len(blob)),
+            array('q', offsets).tobytes(),
+            array('d', (score for _, score in items)).tobytes(),
+            array('q', slots).tobytes(),
+            blob
+        ])
+
+    def __len__(self):
+        return self._n
+
+    def __bool__(self):
+        return self._n > 0
+
+    def __contains__(self, word):
+        return self._index(word) >= 0
+
+    def __getitem__(self, word):
+        i = self._index(word)
+        if i < 0:
+            raise KeyError(word)
+        return self._scores[i]
+
+    def __iter__(self):
+        return self.keys()
+
+    def __reduce__(self):
+        if self._shm is not None:
+            return (CompiledScoreTable.attach, (self._shm.name,))
+        if self._path is not None:
+            return (CompiledScoreTable.load, (self._path, True, self._offset))
+        return (CompiledScoreTable, (self._buf.tobytes(),))
+
+    def get(self, word, default=None):
+        i = self._index(word)
+        if i < 0:
+            return default
+        return self._scores[i]
+
+    def _index(self, word):
+        if not isinstance(word, str) or self._n == 0:
+            return -1
+        key = word.encode('utf-8')
+        offsets, slots, blob, mask = self._offsets, self._slots, self._blob, self._mask
+        slot = crc32(key) & mask
+        while True:
+            i = slots[slot]
+            if i < 0:
+                return -1
+            if blob[offsets[i]:offsets[i+1]] == key:
+                return i
+            slot = (slot + 1) & mask
+
+    def _word(self, i):
+        return self._blob[self._offsets[i]:self._offsets[i+1]].tobytes().decode('utf-8')
+
+    def keys(self):
+        for i in range(self._n):
+            yield self._word(i)
+
+    def values(self):
+        for i in range(self._n):
+            yield self._scores[i]
+
+    def items(self):
+        for i in range(self._n):
+            yield self._word(i), self._scores[i]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    @property
+    def nbytes(self):
+        return len(self._buf)
+
+    def to_shared_memory(self, name=None):
+        """It returns a copy of this table placed in multiprocessing.shared_memory.
+        The creator should call unlink() when the table is not used anymore"""
+        if shared_memory is None:
+            raise RuntimeError('multiprocessing.shared_memory requires Python >= 3.8')
+        shm = shared_memory.SharedMemory(name=name, create=True, size=self.nbytes)
+        shm.buf[:self.nbytes] = self._buf
+        table = CompiledScoreTable.__new__(CompiledScoreTable)
+        table._shm = shm
+        table._mmap = None
+        table._path = None
+        table._offset = 0
+        table._set_buffer(shm.buf)
+        return table
+
+    @classmethod
+    def attach(cls, name):
+        """Attach a table placed in shared memory by other process.
+        The attaching process never removes the block. Only the creator calls unlink()"""
+        if shared_memory is None:
+            raise RuntimeError('multiprocessing.shared_memory requires Python >= 3.8')
+        try:
+            # Python >= 3.13. Attaching process does not remove the block at exit
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            shm = shared_memory.SharedMemory(name=name)
+            # Python < 3.13 registers attached block to resource_tracker of this process,
+            # and the tracker unlinks the block when this process exits (bpo-38119)
+            if resource_tracker is not None:
+                resource_tracker.unregister(shm._name, 'shared_memory')
+        table = cls.__new__(cls)
+        table._shm = shm
+        table._mmap = None
+        table._path = None
+        table._offset = 0
+        table._set_buffer(shm.buf)
+        return table
+
+    def save(self, path):
+        dirname = os.path.dirname(path)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname)
+        with open(path, 'wb') as f:
+            f.write(self._buf)
+
+    @classmethod
+    def load(cls, path, use_mmap=True, offset=0):
+        """If use_mmap is True, the file is mapped read-only and shared by processes.
+        offset is the position of the table in the file"""
+        path = os.path.abspath(path)
+        with open(path, 'rb') as f:
+            if not use_mmap:
+                f.seek(offset)
+                return cls(f.read())
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        table = cls.__new__(cls)
+        table._shm = None
+        table._mmap = mm
+        table._path = path
+        table._offset = offset
+        table._set_buffer(memoryview(mm)[offset:])
+        return table
+
+    def __del__(self):
+        # views must be released before shared memory or mmap is closed
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def close(self):
+        """Release views of the buffer. The table cannot be used after close"""
+        for attr in ['_offsets', '_scores', '_slots', '_blob', '_buf']:
+            view = getattr(self, attr, None)
+            if view is not None:
+                view.release()
+                setattr(self, attr, None)
+        self._n = 0
+        if self._shm is not None:
+            self._shm.close()
+            self._shm = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def unlink(self):
+        """Close and remove shared memory block. Only the creator should call it"""
+        shm = self._shm
+        self.close()
+        if shm is not None:
+            shm.unlink()
@@ -0,0 +1,90 @@
+import os
+from soynlp.utils import iter_chunks
+from soynlp.utils import map_bounded
+
+
+# tokenizer of worker process. It is set only once by _initialize_worker
+_worker_tokenizer = None
+_worker_kwargs = None
+
+def _initialize_worker(tokenizer, kwargs):
+    global _worker_tokenizer, _worker_kwargs
+    _worker_tokenizer = tokenizer
+    _worker_kwargs = kwargs
+
+def _tokenize_chunk(chunk):
+    return [_worker_tokenizer.tokenize(sent, **_worker_kwargs) for sent in chunk]
+
+def tokenize_corpus(tokenizer, corpus, n_jobs=1, chunk_size=1000, output_path=None, **kwargs):
+    """
+    Arguments
+    ---------
+    tokenizer : object which has tokenize(sentence, **kwargs)
+        For example, LTokenizer, MaxScoreTokenizer or NounMatchTokenizer
+    corpus : iterable of str
+        list of str or soynlp.utils.DoublespaceLineCorpus
+    n_jobs : int
+        Number of worker processes. If n_jobs <= 0, it uses all cores
+    chunk_size : int
+        Number of sentences sent to worker at once
+    output_path : str or None
+        If it is not None, tokenized sentences are written as space-separated lines.
+        (word, tag) tokens such as output of MaxLRScoreTokenizer are written as word/tag.
+        flatten=False is not allowed, because nested tokens have no line format
+    kwargs : tokenize arguments such as flatten=True
+
+    Returns
+    -------
+    It yields tokenized sentences in input order when output_path is None.
+    Else, it returns the number of written sentences.
+
+    Usage
+
+        >>> for tokens in tokenize_corpus(tokenizer, corpus, n_jobs=4):
+        >>>     # do something
+
+        >>> tokenize_corpus(tokenizer, corpus, n_jobs=4, output_path='tokenized.txt')
+    """
+
+    if n_jobs <= 0:
+        n_jobs = os.cpu_count() or 1
+    if chunk_size <= 0:
+        raise ValueError('chunk_size should be positive integer, not {}'.format(chunk_size))
+
+    if output_path is not None and kwargs.get('flatten', True) is False:
+        raise ValueError('flatten=False cannot be used with output_path')
+
+    tokenized = _iter_tokenized(tokenizer, corpus, n_jobs, chunk_size, kwargs)
+    if output_path is None:
+        return tokenized
+
+    dirname = os.path.dirname(output_path)
+    if dirname and not os.path.exists(dirname):
+        os.makedirs(dirname)
+
+    n_sents = 0
+    with open(output_path, 'w', encoding='utf-8') as f:
+        for tokens in tokenized:
+            f.write('{}\n'.format(' '.join(_format_token(token) for token in tokens)))
+            n_sents += 1
+    return n_sents
+
+def _format_token(token):
+    if isinstance(token, str):
+        return token
+    if isinstance(token, tuple) and len(token) == 2 and isinstance(token[0], str):
+        word, tag = token
+        return word if tag is None else '{}/{}'.format(word, tag)
+    raise ValueError('Token {} cannot be written as a word. Use flatten=True'.format(token))
+
+def _iter_tokenized(tokenizer, corpus, n_jobs, chunk_size, kwargs):
+    if n_jobs == 1:
+        for sent in corpus:
+            yield tokenizer.tokenize(sent, **kwargs)
+        return
+
+    # tokenizer is shipped to each worker only once with initializer
+    for tokenized in map_bounded(_tokenize_chunk, iter_chunks(corpus, chunk_size),
+        n_jobs, _initialize_worker, (tokenizer, kwargs)):
+        for tokens in tokenized:
+            yield tokens
@@ -0,0 +1,128 @@
+import json
+import os
+import struct
+
+from ._compiled import CompiledScoreTable
+
+
+_MAGIC = b'SOYNLPTK'
+_VERSION = 1
+# magic, version, size of json metadata
+_HEADER = struct.Struct('<8sQQ')
+
+
+def _padding(size):
+    # tables begin at 8 bytes aligned position
+    return (8 - size % 8) % 8
+
+
+def save_model(path, name, params, tables):
+    """Write tokenizer model file.
+
+    Layout
+
+        header   : magic, version, size of metadata
+        metadata : utf-8 json of {'class': name, 'params': params, 'tables': {key: [offset, size]}}
+        tables   : CompiledScoreTable buffers. offset is relative to the end of metadata
+
+    Arguments
+    ---------
+    path : str
+        Model file path
+    name : str
+        Class name of tokenizer
+    params : dict
+        JSON serializable arguments of tokenizer
+    tables : dict of {str: dict or CompiledScoreTable}
+        Score tables. They are stored in compiled form
+    """
+
+    buffers = []
+    positions = {}
+    offset = 0
+    for key, table in tables.items():
+        if not isinstance(table, CompiledScoreTable):
+            table = CompiledScoreTable.from_dict(table)
+        buf = table._buf.tobytes()
+        buf += b'\0' * _padding(len(buf))
+        positions[key] = [offset, len(buf)]
+        buffers.append(buf)
+        offset += len(buf)
+
+    metadata = {'class': name, 'params': params, 'tables': positions}
+    metadata = json.dumps(metadata, ensure_ascii=False).encode('utf-8')
+    metadata += b' ' * _padding(_HEADER.size + len(metadata))
+
+    dirname = os.path.dirname(path)
+    if dirname and not os.path.exists(dirname):
+        os.makedirs(dirname)
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, len(metadata)))
+        f.write(metadata)
+        for buf in buffers:
+            f.write(buf)
+
+def load_model(path, name=None, use_mmap=True):
+    """Read tokenizer model file written by save_model.
+
+    Arguments
+    ---------
+    path : str
+        Model file path
+    name : str or None
+        If not None, it checks that the model is of the class
+    use_mmap : Boolean
+        If True, tables are mapped read-only from the file, so loading is
+        independent of the table size and worker processes share the pages
+
+    Returns
+    -------
+    name : str
+        Class name of tokenizer
+    params : dict
+        Arguments of tokenizer
+    tables : dict of {str: CompiledScoreTable}
+    """
+
+    with open(path, 'rb') as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError('{} is not soynlp tokenizer model'.format(path))
+        magic, version, metadata_size = _HEADER.unpack(header)
+        if magic != _MAGIC:
+            raise ValueError('{} is not soynlp tokenizer model'.format(path))
+        if version != _VERSION:
+            raise ValueError('Tokenizer model version {} is not supported. Expected {}. Save the model again'.format(
+                version, _VERSION))
+        metadata = json.loads(f.read(metadata_size).decode('utf-8'))
+
+    if name is not None and metadata['class'] != name:
+        raise ValueError('{} is {} model, not {}'.format(path, metadata['class'], name))
+
+    begin = _HEADER.size + metadata_size
+    tables = {key: CompiledScoreTable.load(path, use_mmap, begin + offset)
+              for key, (offset, _) in metadata['tables'].items()}
+    return metadata['class'], metadata['params'], tables
+
+def load_tokenizer(path, use_mmap=True, cache_size=0):
+    """Load tokenizer of any class saved with its save(path)
+
+    Usage
+
+        tokenizer = MaxScoreTokenizer(scores)
+        tokenizer.save('maxscore.model')
+        tokenizer = load_tokenizer('maxscore.model')
+    """
+
+    from ._tokenizer import LTokenizer
+    from ._tokenizer import MaxScoreTokenizer
+    from ._tokenizer import MaxLRScoreTokenizer
+    from ._noun_tokenizer import NounMatchTokenizer
+
+    classes = {cls.__name__: cls for cls in
+        [LTokenizer, MaxScoreTokenizer, MaxLRScoreTokenizer, NounMatchTokenizer]}
+
+    name, params, tables = load_model(path, use_mmap=use_mmap)
+    if not (name in classes):
+        raise ValueError('{} model cannot be loaded with load_tokenizer'.format(name))
+    return classes[name]._from_model(params, tables, cache_size)
@@ -1,7 +1,10 @@
 # -*- encoding:utf8 -*-
 
 import re
-from soynlp.hangle import decompose, compose
+from soynlp.hangle._hangle import kor_begin, kor_end
+from soynlp.hangle._hangle import chosung_base, jungsung_base
+from soynlp.hangle._hangle import chosung_list, jungsung_list, jongsung_list
+from soynlp.hangle._hangle import jaum_end
 
 repeatchars_patterns = [
     re.compile('(\w\w\w\w)\\1{3,}'),
@@ -9,10 +12,34 @@ repeatchars_patterns = [
     re.compile('(\w\w)\\1{3,}'),
     re.compile('(\w)\\1{3,}')
 ]
+# It matches if any of repeatchars_patterns matches
+_repeat_pattern = re.compile('(\w)\\1{3}|(\w\w)\\2{3}|(\w\w\w)\\3{3}|(\w\w\w\w)\\4{3}')
+# standalone jaum and moum
+_jamo_pattern = re.compile('[ㄱ-ㅣ]')
+_jaum_end_char = chr(jaum_end)
+
+def _build_tables():
+    # {syllable: (jongsung, syllable without jongsung)}
+    jong_split = {}
+    # {syllable without jongsung: (jungsung, chosung + jungsung)}
+    open_syllable = {}
+    for i in range(kor_end - kor_begin + 1):
+        cho = i // chosung_base
+        jung = (i - cho * chosung_base) // jungsung_base
+        jong = i - cho * chosung_base - jung * jungsung_base
+        c = chr(kor_begin + i)
+        if jong == 0:
+            open_syllable[c] = (jungsung_list[jung], chosung_list[cho] + jungsung_list[jung])
+        else:
+            jong_split[c] = (jongsung_list[jong], chr(kor_begin + i - jong))
+    return jong_split, open_syllable
+
+_jong_split, _open_syllable = _build_tables()
 
 def normalize(sentence, num_repeat=2):
-    tokens = sentence.split()
-    return ' '.join(_normalize_korean_token(token, num_repeat) for token in tokens)
+    # Patterns never match whitespace, so normalizing joined tokens at once
+    # is same with normalizing each token
+    return _normalize_korean_token(' '.join(sentence.split()), num_repeat)
 
 def _normalize_korean_token(token, num_repeat=2):
     token = _normalize_emoji(token)
@@ -20,26 +47,36 @@ def _normalize_korean_token(token, num_repeat=2):
     return token
 
 def _remove_repeat(token, num_repeat=2):
-    if num_repeat > 0:
+    if num_repeat > 0 and _repeat_pattern.search(token):
         for pattern in repeatchars_patterns:
             token = pattern.sub('\\1' * num_repeat, token)
     return token
 
 def _normalize_emoji(token):
-    if len(token) <= 1:
-        return token
-    token_ = []
-    decomposeds = [decompose(c) for c in token]
-    for char, cd, nd in zip(token, decomposeds, decomposeds[1:]):
-        if cd == None or nd == None:
-            token_.append(char)
-            continue
+    """Each character is normalized with its next character, only when next one is jaum or moum.
+    So it checks only the characters followed by standalone jamo"""
+
+    pieces = []
+    b = 0
+    for m in _jamo_pattern.finditer(token, 1):
+        i = m.start()
+        char, next_char = token[i-1], token[i]
         # 앜ㅋㅋㅋㅋ -> 아ㅋㅋㅋㅋㅋ
-        if (nd[1] == ' ') and (cd[2] == nd[0]):
-            token_.append(compose(cd[0], cd[1], ' ') + nd[0])
+        if next_char <= _jaum_end_char:
+            split = _jong_split.get(char)
+            if split is None or split[0] != next_char:
+                continue
+            normalized = split[1] + next_char
         # ㅋ쿠ㅜㅜ -> ㅋㅋㅜㅜㅜ
-        elif (cd[2] == ' ') and (nd[0] == ' ') and (cd[1] == nd[1]):
-            token_.append((cd[0] + cd[1]) if cd [0] != ' ' else cd[1])
         else:
-            token_.append(char)
-    return ''.join(token_) + token[-1]
\ No newline at end of file
+            open_ = _open_syllable.get(char)
+            if open_ is None or open_[0] != next_char:
+                continue
+            normalized = open_[1]
+        pieces.append(token[b:i-1])
+        pieces.append(normalized)
+        b = i
+    if not pieces:
+        return token
+    pieces.append(token[b:])
+    return ''.join(pieces)
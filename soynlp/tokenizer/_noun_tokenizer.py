@@ -1,13 +1,28 @@
+from ._cache import EojeolCache
+from ._model import load_model
+from ._model import save_model
 from ._tokenizer import MaxScoreTokenizer
+from ._tokenizer import _TokenizerMixin
 
-class NounLMatchTokenizer:
+class NounLMatchTokenizer(_TokenizerMixin):
 
     def __init__(self, nouns):
-        self._nouns  = nouns
+        self.nouns = nouns
 
     def __call__(self, sentence, compose_compound=True):
         return self.tokenize(sentence, compose_compound)
 
+    @property
+    def nouns(self):
+        return self._nouns
+
+    @nouns.setter
+    def nouns(self, nouns):
+        # nouns is copied into frozenset, so it cannot be changed without rebuilding
+        # candidate noun lengths. They are in descending order for longest matching
+        self._nouns = frozenset(nouns)
+        self._lengths = sorted({len(noun) for noun in self._nouns if noun}, reverse=True)
+
     def tokenize(self, sentence, compose_compound=True):
 
         tokens = [self._max_length_l_tokenize(token)
@@ -27,52 +42,108 @@ class NounLMatchTokenizer:
         tokens = [token for token in tokens if token]
         return tokens
 
-    def _max_length_l_tokenize(self, token):
-        
-        def nouns_to_larray_and_r(token, nouns_):
-            e = sum((len(noun) for noun in nouns_))
-            return nouns_, token[e:]
-
-        nouns = []
-        n = len(token)
-
-        # string match for generating candidats
-        for b in range(n):
-            for e in range(b, n+1):
-                subword = token[b:e]
-                if subword in self._nouns:
-                    # (word, begin, length)
-                    nouns.append((subword, b, e - b))
+    def _eojeol_spans(self, eojeol, compose_compound=True):
+        nouns, r = self._max_length_l_tokenize(eojeol)
+        if not nouns:
+            return
+        if compose_compound:
+            yield 0, len(eojeol) - len(r)
+            return
+        b = 0
+        for noun in nouns:
+            yield b, b + len(noun)
+            b += len(noun)
 
-        # sort. fisrt order: begin index, second order: length (desc)
-        nouns = sorted(nouns, key=lambda x:(x[1], -x[2]))
+    def _max_length_l_tokenize(self, token):
+        """It concatenates the longest noun begins at the end of previous noun from token[0].
+        Each step probes only existing noun lengths, not all substrings of token"""
 
         nouns_ = []
+        n = len(token)
         e = 0
 
-        while nouns:
-            # pop first element
-            noun, b, len_ = nouns.pop(0)
-            # only concatenate nouns
-            if not (b == e):
-                return nouns_to_larray_and_r(token, nouns_)
-            # append noun and update end index
-            nouns_.append(noun)
-            e = b + len_
-            nouns = [noun for noun in nouns if noun[1] >= e]
+        while e < n:
+            for len_ in self._lengths:
+                if len_ <= n - e and token[e:e+len_] in self._nouns:
+                    break
+            else:
+                break
+            nouns_.append(token[e:e+len_])
+            e += len_
 
-        return nouns_to_larray_and_r(token, nouns_)
+        return nouns_, token[e:]
 
-class NounMatchTokenizer:
+class NounMatchTokenizer(_TokenizerMixin):
 
-    def __init__(self, noun_scores):
+    def __init__(self, noun_scores, cache_size=0):
         self._tokenizer = MaxScoreTokenizer(scores=noun_scores)
+        self._cache = EojeolCache(cache_size) if cache_size > 0 else None
 
     def __call__(self, sentence, flatten=True, compose_compound=True):
         return self.tokenize(sentence, flatten, compose_compound)
 
+    @property
+    def noun_scores(self):
+        return self._tokenizer.scores
+
+    @noun_scores.setter
+    def noun_scores(self, noun_scores):
+        self._tokenizer.scores = noun_scores
+        self.clear_cache()
+
+    def cache_info(self):
+        return self._cache.info() if self._cache is not None else None
+
+    def clear_cache(self):
+        if self._cache is not None:
+            self._cache.clear()
+
+    def save(self, path):
+        """Save noun scores as compiled table. Load it with NounMatchTokenizer.load(path)"""
+        save_model(path, self.__class__.__name__, {}, {'noun_scores': self.noun_scores})
+
+    @classmethod
+    def load(cls, path, use_mmap=True, cache_size=0):
+        _, params, tables = load_model(path, cls.__name__, use_mmap)
+        return cls._from_model(params, tables, cache_size)
+
+    @classmethod
+    def _from_model(cls, params, tables, cache_size=0):
+        return cls(tables['noun_scores'], cache_size=cache_size, **params)
+
     def tokenize(self, sentence, flatten=True, compose_compound=True):
 
+        sentence_ = []
+        for eojeol in sentence.split():
+
+            eojeol = eojeol.strip()
+            if not eojeol:
+                continue
+
+            sentence_.append(self._tokenize_eojeol(eojeol, compose_compound))
+
+        if flatten:
+            sentence_ = [word[0] for words in sentence_ for word in words if word[0]]
+
+        return sentence_
+
+    def _eojeol_spans(self, eojeol, compose_compound=True):
+        for word, b, e, _, _ in self._tokenize_eojeol(eojeol, compose_compound):
+            if word:
+                yield b, e
+
+    def _tokenize_eojeol(self, eojeol, compose_compound=True):
+        if self._cache is None:
+            return self._match(eojeol, compose_compound)
+        words = self._cache.get_or_compute(
+            (eojeol, compose_compound), self._match_as_tuple, eojeol, compose_compound)
+        return list(words)
+
+    def _match_as_tuple(self, eojeol, compose_compound=True):
+        return tuple(self._match(eojeol, compose_compound))
+
+    def _match(self, eojeol, compose_compound=True):
+
         def concatenate(eojeol, words):
             words_, b, e, score = [], 0, 0, 0
             for noun_, b_, e_, score_, _ in words:
@@ -85,23 +156,11 @@ class NounMatchTokenizer:
                 words_.append((eojeol[b:e], b, e, score, e-b))
             return words_
 
-        sentence_ = []
-        for eojeol in sentence.split():
-
-            eojeol = eojeol.strip()
-            if not eojeol:
-                continue
-
-            words = self._tokenizer(eojeol, flatten=False)[0]
-            # remove non-noun words
-            words = [word for word in words if word[3] > 0]
+        words = self._tokenizer(eojeol, flatten=False)[0]
+        # remove non-noun words
+        words = [word for word in words if word[3] > 0]
 
-            if compose_compound:
-                words = concatenate(eojeol, words)
-
-            sentence_.append(words)
-
-        if flatten:
-            sentence_ = [word[0] for words in sentence_ for word in words if word[0]]
+        if compose_compound:
+            words = concatenate(eojeol, words)
 
-        return sentence_
\ No newline at end of file
+        return words
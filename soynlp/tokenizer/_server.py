@@ -0,0 +1,355 @@
+import asyncio
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+import socket
+import threading
+import time
+
+import numpy as np
+
+from ._model import load_tokenizer
+
+
+# model of worker process. It is set only once by _initialize_worker
+_worker_model = None
+_worker_method = None
+
+def _initialize_worker(model, method):
+    global _worker_model, _worker_method
+    _worker_model = model
+    _worker_method = method
+
+def _run_batch(sents, kwargs):
+    func = getattr(_worker_model, _worker_method)
+    results = []
+    for sent in sents:
+        try:
+            results.append((True, func(sent, **kwargs)))
+        except Exception as e:
+            results.append((False, '{}: {}'.format(type(e).__name__, e)))
+    return results
+
+class TokenizerServer:
+    """Local tokenization server which shares one warm model with many client processes.
+
+    Protocol is JSON lines. Each request is one JSON object in one line and
+    each response has the id of its request. Responses of a connection are
+    written in completion order.
+
+        request  : {"id": 0, "sentence": "데이터는 데이터센터의", "kwargs": {"flatten": true}}
+        response : {"id": 0, "result": ["데이터", "는", "데이터", "센터의"]}
+        request  : {"id": 1, "command": "stats"}
+        response : {"id": 1, "result": {"requests": 1, "latency_p50_ms": 2.1, ...}}
+        error    : {"id": 0, "error": "KeyError: 'sentence'"}
+
+    Concurrent requests are collected into a batch during max_delay seconds
+    (or until max_batch_size), grouped by kwargs and tokenized in a process pool.
+    The model is sent to each worker process only once.
+
+    Arguments
+    ---------
+    model : object or str
+        Tokenizer or tagger, or a model file path saved with tokenizer.save(path)
+    method : str
+        Method of model which is called as method(sentence, **kwargs). For taggers, use 'tag'
+    n_jobs : int
+        Number of worker processes. If n_jobs <= 0, it uses all cores
+    max_batch_size : int
+        Maximum number of sentences in a batch
+    max_delay : float
+        Seconds to wait for more requests after the first request of a batch
+    latency_window : int
+        Number of recent requests used for latency percentiles
+
+    Usage
+
+        server = TokenizerServer(tokenizer, n_jobs=4)
+        server.serve(path='/tmp/soynlp.sock')  # blocks until shutdown()
+
+        # in client process
+        client = TokenizerClient(path='/tmp/soynlp.sock')
+        client.tokenize('데이터는 데이터센터의')
+    """
+
+    def __init__(self, model, method='tokenize', n_jobs=1,
+        max_batch_size=64, max_delay=0.002, latency_window=10000):
+
+        if isinstance(model, str):
+            model = load_tokenizer(model)
+        if not callable(getattr(model, method, None)):
+            raise ValueError('{} has no method {}'.format(model.__class__.__name__, method))
+        if max_batch_size <= 0:
+            raise ValueError('max_batch_size should be positive integer, not {}'.format(max_batch_size))
+        if n_jobs <= 0:
+            n_jobs = os.cpu_count() or 1
+
+        self.model = model
+        self.method = method
+        self.n_jobs = n_jobs
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+
+        self._latencies = deque(maxlen=latency_window)
+        self._n_requests = 0
+        self._n_sentences = 0
+        self._n_batches = 0
+        self._n_errors = 0
+        self._started_at = None
+
+        self._loop = None
+        self._server = None
+        self._executor = None
+        self._queue = None
+        self._batcher = None
+        self._semaphore = None
+        self._stopped = None
+        self._path = None
+        self._handlers = {}
+        self._ready = threading.Event()
+
+    @property
+    def address(self):
+        """Unix socket path or (host, port)"""
+        if self._path is not None:
+            return self._path
+        if self._server is None:
+            return None
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def start(self, path=None, host='127.0.0.1', port=0):
+        """Start server in running event loop. If path is not None, it listens on unix socket"""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._semaphore = asyncio.Semaphore(2 * self.n_jobs)
+        self._stopped = asyncio.Event()
+        self._executor = ProcessPoolExecutor(self.n_jobs,
+            initializer=_initialize_worker, initargs=(self.model, self.method))
+        # workers are started and loaded the model before accepting connections
+        await asyncio.gather(*[self._loop.run_in_executor(self._executor, _run_batch, [], {})
+                               for _ in range(self.n_jobs)])
+        self._batcher = asyncio.ensure_future(self._batch_loop())
+
+        # sentence may be longer than default limit of StreamReader
+        if path is not None:
+            if os.path.exists(path):
+                os.remove(path)
+            self._path = path
+            self._server = await asyncio.start_unix_server(self._handle, path=path, limit=2 ** 24)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port, limit=2 ** 24)
+
+        self._started_at = time.time()
+        self._ready.set()
+        return self.address
+
+    async def stop(self):
+        # stop accepting connections
+        if self._server is not None:
+            self._server.close()
+        # stop reading new requests. Each handler answers the requests it has read,
+        # drains and then closes its connection
+        for reader, writer in list(self._handlers.values()):
+            writer.transport.pause_reading()
+            reader.feed_eof()
+        if self._handlers:
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+        if self._batcher is not None:
+            self._batcher.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        if self._path is not None and os.path.exists(self._path):
+            os.remove(self._path)
+        self._ready.clear()
+
+    def serve(self, path=None, host='127.0.0.1', port=0):
+        """Run server until shutdown() is called"""
+        asyncio.run(self._serve(path, host, port))
+
+    async def _serve(self, path, host, port):
+        await self.start(path, host, port)
+        try:
+            await self._stopped.wait()
+        finally:
+            await self.stop()
+
+    def shutdown(self):
+        """Stop serve(). It can be called from other thread"""
+        if self._loop is not None and self._stopped is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+
+    def wait_until_ready(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    def stats(self):
+        elapsed = time.time() - self._started_at if self._started_at else 0
+        latencies = np.asarray(self._latencies) * 1000
+        return {
+            'uptime_seconds': elapsed,
+            'requests': self._n_requests,
+            'sentences': self._n_sentences,
+            'batches': self._n_batches,
+            'errors': self._n_errors,
+            'pending': self._queue.qsize() if self._queue is not None else 0,
+            'mean_batch_size': self._n_sentences / self._n_batches if self._n_batches else 0,
+            'sentences_per_second': self._n_sentences / elapsed if elapsed > 0 else 0,
+            'latency_p50_ms': float(np.percentile(latencies, 50)) if latencies.shape[0] else 0,
+            'latency_p99_ms': float(np.percentile(latencies, 99)) if latencies.shape[0] else 0
+        }
+
+    async def _handle(self, reader, writer):
+        handler = asyncio.current_task()
+        self._handlers[handler] = (reader, writer)
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                task = asyncio.ensure_future(self._respond(line, writer, write_lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            del self._handlers[handler]
+            writer.close()
+
+    async def _respond(self, line, writer, write_lock):
+        begin = time.perf_counter()
+        request_id = None
+        try:
+            request = json.loads(line.decode('utf-8'))
+            request_id = request.get('id')
+            if request.get('command') == 'stats':
+                response = {'id': request_id, 'result': self.stats()}
+            else:
+                sentence = request['sentence']
+                if not isinstance(sentence, str):
+                    raise ValueError('sentence should be str, not {}'.format(type(sentence).__name__))
+                result = await self._submit(sentence, request.get('kwargs') or {})
+                response = {'id': request_id, 'result': result}
+                self._n_requests += 1
+                self._latencies.append(time.perf_counter() - begin)
+        except Exception as e:
+            self._n_errors += 1
+            response = {'id': request_id, 'error': '{}: {}'.format(type(e).__name__, e)}
+
+        data = (json.dumps(response, ensure_ascii=False) + '\n').encode('utf-8')
+        async with write_lock:
+            writer.write(data)
+            await writer.drain()
+
+    def _submit(self, sentence, kwargs):
+        future = self._loop.create_future()
+        key = json.dumps(kwargs, sort_keys=True)
+        self._queue.put_nowait((sentence, key, kwargs, future))
+        return future
+
+    async def _batch_loop(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.max_delay
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            groups = {}
+            for item in batch:
+                groups.setdefault(item[1], []).append(item)
+            for items in groups.values():
+                # at most 2 * n_jobs batches are in flight
+                await self._semaphore.acquire()
+                asyncio.ensure_future(self._run(items))
+
+    async def _run(self, items):
+        try:
+            sents = [item[0] for item in items]
+            results = await self._loop.run_in_executor(
+                self._executor, _run_batch, sents, items[0][2])
+        except Exception as e:
+            for item in items:
+                if not item[3].done():
+                    item[3].set_exception(e)
+        else:
+            self._n_batches += 1
+            self._n_sentences += len(items)
+            for item, (success, result) in zip(items, results):
+                if item[3].done():
+                    continue
+                if success:
+                    item[3].set_result(result)
+                else:
+                    item[3].set_exception(ValueError(result))
+        finally:
+            self._semaphore.release()
+
+class TokenizerClient:
+    """Blocking client of TokenizerServer
+
+    Usage
+
+        with TokenizerClient(path='/tmp/soynlp.sock') as client:
+            client.tokenize('데이터는 데이터센터의', flatten=False)
+            client.stats()
+    """
+
+    def __init__(self, path=None, host='127.0.0.1', port=None, timeout=None):
+        if path is not None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            address = path
+        elif port is not None:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            address = (host, port)
+        else:
+            raise ValueError('path or port should be given')
+        sock.settimeout(timeout)
+        sock.connect(address)
+        self._socket = sock
+        self._file = sock.makefile('rwb')
+        self._id = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _request(self, request):
+        self._id += 1
+        request['id'] = self._id
+        self._file.write((json.dumps(request, ensure_ascii=False) + '\n').encode('utf-8'))
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError('Server closed connection')
+        response = json.loads(line.decode('utf-8'))
+        if 'error' in response:
+            raise ValueError(response['error'])
+        return response['result']
+
+    def tokenize(self, sentence, **kwargs):
+        return self._request({'sentence': sentence, 'kwargs': kwargs})
+
+    def stats(self):
+        return self._request({'command': 'stats'})
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
@@ -3,12 +3,68 @@ import sys
 if sys.version_info <= (2,7):
     reload(sys)
     sys.setdefaultencoding('utf-8')
+from array import array
 from pprint import pprint
 import re
 import numpy as np
-
-
-class RegexTokenizer:
+from ._cache import EojeolCache
+from ._compiled import CompiledScoreTable
+from ._corpus import tokenize_corpus
+from ._model import load_model
+from ._model import save_model
+from soynlp.utils import NormalizedLRGraph
+from soynlp.utils import Trie
+
+_eojeol_pattern = re.compile('\S+', re.UNICODE)
+
+def _iter_eojeols(sentence):
+    # same eojeols with sentence.split(), without building a list
+    for m in _eojeol_pattern.finditer(sentence):
+        yield m.group()
+
+def _eojeol_offsets(sentence):
+    # eojeols of sentence.split() with their begin index in sentence
+    b = 0
+    for eojeol in sentence.split():
+        b = sentence.find(eojeol, b)
+        yield eojeol, b
+        b += len(eojeol)
+
+
+class _TokenizerMixin:
+    """Sentence and corpus level methods shared by the tokenizers.
+    A tokenizer defines _eojeol_spans(eojeol, **kwargs) which yields (begin, end)
+    of each token in eojeol, with the arguments of its tokenize except flatten"""
+
+    def tokenize_corpus(self, corpus, n_jobs=1, chunk_size=1000, output_path=None, **kwargs):
+        return tokenize_corpus(self, corpus, n_jobs, chunk_size, output_path, **kwargs)
+
+    def iter_tokens(self, sentence, **kwargs):
+        """It yields same tokens with tokenize(sentence, **kwargs) without building token list"""
+        for eojeol in _iter_eojeols(sentence):
+            for b, e in self._eojeol_spans(eojeol, **kwargs):
+                yield eojeol[b:e]
+
+    def iter_corpus(self, corpus, **kwargs):
+        """It yields iter_tokens(sentence, **kwargs) of each sentence in corpus"""
+        for sentence in corpus:
+            yield self.iter_tokens(sentence, **kwargs)
+
+    def tokenize_spans(self, sentence, **kwargs):
+        """It returns (starts, ends) of array('i') instead of token strings.
+        sentence[starts[i]:ends[i]] is the i-th token of tokenize(sentence, **kwargs)"""
+        starts, ends = array('i'), array('i')
+        for eojeol, b in _eojeol_offsets(sentence):
+            for b_, e_ in self._eojeol_spans(eojeol, **kwargs):
+                starts.append(b + b_)
+                ends.append(b + e_)
+        return starts, ends
+
+    def _eojeol_spans(self, eojeol, **kwargs):
+        raise NotImplementedError('{} does not support token spans'.format(self.__class__.__name__))
+
+
+class RegexTokenizer(_TokenizerMixin):
     
     def __init__(self):
         self._patterns = [
@@ -42,7 +98,14 @@ class RegexTokenizer:
         if flatten:
             tokens = [subtoken for token in tokens for subtoken in token if subtoken]
         return tokens
-    
+
+    def _eojeol_spans(self, eojeol):
+        # subtokens are consecutive substrings of eojeol
+        b = 0
+        for subtoken in self._tokenize(eojeol):
+            yield b, b + len(subtoken)
+            b += len(subtoken)
+
     def _tokenize(self, s, debug=False):
         for name, pattern in self._patterns:
             
@@ -84,31 +147,48 @@ class RegexTokenizer:
         return s
 
 
-class LTokenizer:
+class LTokenizer(_TokenizerMixin):
     
-    def __init__(self, scores=None, default_score=0.0):
+    def __init__(self, scores=None, default_score=0.0, cache_size=0):
         self._scores = scores if scores else {}
         self._ds = default_score
+        self._cache = EojeolCache(cache_size) if cache_size > 0 else None
 
     def __call__(self, sentence, tolerance=0.0, flatten=True, remove_r=False):
         return self.tokenize(sentence, tolerance, flatten, remove_r)
 
-    def tokenize(self, sentence, tolerance=0.0, flatten=True, remove_r=False):
-        
-        def token_to_lr(token, tolerance=0.0):
-            length = len(token)
-            if length <= 2: return (token, '')
-            candidates = [(token[:e], token[e:]) for e in range(2, length + 1)]
-            candidates = [(self._scores.get(t[0], self._ds), t[0], t[1]) for t in candidates]
-            if tolerance > 0:
-                max_score = max([c[0] for c in candidates])
-                candidates = [c for c in candidates if (max_score - c[0]) <= tolerance]
-                best = sorted(candidates, key=lambda x:len(x[1]), reverse=True)[0]
-            else:
-                best = sorted(candidates, key=lambda x:(x[0], len(x[1])), reverse=True)[0]
-            return (best[1], best[2])
+    @property
+    def scores(self):
+        return self._scores
+
+    @scores.setter
+    def scores(self, scores):
+        self._scores = scores if scores else {}
+        self.clear_cache()
+
+    def cache_info(self):
+        return self._cache.info() if self._cache is not None else None
+
+    def clear_cache(self):
+        if self._cache is not None:
+            self._cache.clear()
+
+    def save(self, path):
+        """Save scores as compiled table. Load it with LTokenizer.load(path)"""
+        save_model(path, self.__class__.__name__,
+            {'default_score': self._ds}, {'scores': self._scores})
+
+    @classmethod
+    def load(cls, path, use_mmap=True, cache_size=0):
+        _, params, tables = load_model(path, cls.__name__, use_mmap)
+        return cls._from_model(params, tables, cache_size)
+
+    @classmethod
+    def _from_model(cls, params, tables, cache_size=0):
+        return cls(scores=tables['scores'], cache_size=cache_size, **params)
 
-        tokens = [token_to_lr(token, tolerance) for token in sentence.split()]
+    def tokenize(self, sentence, tolerance=0.0, flatten=True, remove_r=False):
+        tokens = [self._tokenize_eojeol(token, tolerance) for token in sentence.split()]
         
         if remove_r:
             tokens = [token[0] for token in tokens]
@@ -117,24 +197,92 @@ class LTokenizer:
             tokens = [subtoken for token in tokens for subtoken in token if subtoken]
         
         return tokens
+
+    def _eojeol_spans(self, eojeol, tolerance=0.0, remove_r=False):
+        l, r = self._tokenize_eojeol(eojeol, tolerance)
+        yield 0, len(l)
+        if r and not remove_r:
+            yield len(l), len(eojeol)
+
+    def _tokenize_eojeol(self, token, tolerance=0.0):
+        if self._cache is None:
+            return self._token_to_lr(token, tolerance)
+        return self._cache.get_or_compute((token, tolerance), self._token_to_lr, token, tolerance)
+
+    def _token_to_lr(self, token, tolerance=0.0):
+        length = len(token)
+        if length <= 2: return (token, '')
+        candidates = [(token[:e], token[e:]) for e in range(2, length + 1)]
+        candidates = [(self._scores.get(t[0], self._ds), t[0], t[1]) for t in candidates]
+        if tolerance > 0:
+            max_score = max([c[0] for c in candidates])
+            candidates = [c for c in candidates if (max_score - c[0]) <= tolerance]
+            best = sorted(candidates, key=lambda x:len(x[1]), reverse=True)[0]
+        else:
+            best = sorted(candidates, key=lambda x:(x[0], len(x[1])), reverse=True)[0]
+        return (best[1], best[2])
     
 
-class MaxScoreTokenizer:
+class MaxScoreTokenizer(_TokenizerMixin):
     
-    def __init__(self, scores=None, max_length=10, default_score=0.0):
+    def __init__(self, scores=None, max_length=10, default_score=0.0, cache_size=0):
         self._scores = scores if scores else {}
         self._max_length = max_length
         self._ds = default_score
+        self._cache = EojeolCache(cache_size) if cache_size > 0 else None
 
     def __call__(self, sentence, flatten=True):
         return self.tokenize(sentence, flatten)
 
+    @property
+    def scores(self):
+        return self._scores
+
+    @scores.setter
+    def scores(self, scores):
+        self._scores = scores if scores else {}
+        self.clear_cache()
+
+    def cache_info(self):
+        return self._cache.info() if self._cache is not None else None
+
+    def clear_cache(self):
+        if self._cache is not None:
+            self._cache.clear()
+
+    def save(self, path):
+        """Save scores as compiled table. Load it with MaxScoreTokenizer.load(path)"""
+        save_model(path, self.__class__.__name__,
+            {'max_length': self._max_length, 'default_score': self._ds},
+            {'scores': self._scores})
+
+    @classmethod
+    def load(cls, path, use_mmap=True, cache_size=0):
+        _, params, tables = load_model(path, cls.__name__, use_mmap)
+        return cls._from_model(params, tables, cache_size)
+
+    @classmethod
+    def _from_model(cls, params, tables, cache_size=0):
+        return cls(scores=tables['scores'], cache_size=cache_size, **params)
+
     def tokenize(self, sentence, flatten=True):
-        tokens = [self._recursive_tokenize(token) for token in sentence.split()]
+        tokens = [self._tokenize_eojeol(token) for token in sentence.split()]
         if flatten:
             tokens = [subtoken[0] for token in tokens for subtoken in token]
         return tokens
 
+    def _eojeol_spans(self, eojeol):
+        for _, b, e, _, _ in self._tokenize_eojeol(eojeol):
+            yield b, e
+
+    def _tokenize_eojeol(self, token):
+        if self._cache is None:
+            return self._recursive_tokenize(token)
+        return list(self._cache.get_or_compute(token, self._recursive_tokenize_as_tuple, token))
+
+    def _recursive_tokenize_as_tuple(self, token):
+        return tuple(self._recursive_tokenize(token))
+
     def _recursive_tokenize(self, token, range_l=0, debug=False):
         
         length = len(token)
@@ -224,65 +372,206 @@ class MaxScoreTokenizer:
         score = self._scores.get(subtoken, self._ds)
         return [(subtoken, b, len(token), score, len(subtoken))]
 
-class MaxLRScoreTokenizer:
+class MaxLRScoreTokenizer(_TokenizerMixin):
     def __init__(self, Dl=None, Dr=None,
                  preference_l=None, preference_r=None,
                  lrgraph=None, tokenizer_builder=None,
                  max_lscore_difference=0.3, max_lscore_diffratio=0.5, # Expansion L
-                 ensurable_score_l=0.5, ensurable_score_lr_diff=0.3   # R overlap L
+                 ensurable_score_l=0.5, ensurable_score_lr_diff=0.3,  # R overlap L
+                 cache_size=0
                 ):
 
-        # Normalize L-R graph to prob graph
-        def norm(rdict):
-            sum_ = sum(rdict.values())
-            return {r:c/sum_ for r,c in rdict.items()}
+        self._cache = EojeolCache(cache_size) if cache_size > 0 else None
+
+        # L-R graph is normalized to prob graph on demand
         self.lrgraph = lrgraph if lrgraph else {}
-        self.lrgraph_norm = {l:norm(rdict) for l,rdict in self.lrgraph.items()}
+        self.lrgraph_norm = NormalizedLRGraph(self.lrgraph)
 
         # Expanding dictionary from lrgraph
         #self.Dl, self.Dr = tokenizer_builder(self.lrgraph) if tokenizer_builder else LRTokenizerBuilder()(self.lrgraph)
-        self.Dl, self.Dr = tokenizer_builder(self.lrgraph) if tokenizer_builder else ({}, {})
-        
-        # Dictionary type check
-        if not Dl: Dl = {}
-        if not Dr: Dr = {}
-
-        if not type(Dl) == dict:
-            Dl = {l:1.0 for l in Dl}
-        self.Dl.update(Dl)
-        if not type(Dr) == dict:
-            Dr = {r:1.0 for r in Dr}
-        self.Dr.update(Dr)
-
-        # Add preference words into dictionary
-        self.Pl = preference_l if preference_l else {}
-        self.Pr = preference_r if preference_r else {}
-
-        for l in self.Pl:
-            if not (l in self.Dl):
-                self.Dl[l] = 1.0
-        for r in self.Pr:
-            if not (r in self.Dr):
-                self.Dr[r] = 1.0
-
-        self.lmax = max((len(w) for w in self.Dl)) if self.Dl else 0
-        self.rmax = max((len(w) for w in self.Dr)) if self.Dr else 0
-        self.base_tokenizer = MaxScoreTokenizer(scores=self.Dr)
+        self._Dl, self._Dr = tokenizer_builder(self.lrgraph) if tokenizer_builder else ({}, {})
         
-        self.max_lscore_difference = max_lscore_difference
-        self.max_lscore_diffratio = max_lscore_diffratio
-        self.ensurable_score_l = ensurable_score_l
-        self.ensurable_score_lr_diff = ensurable_score_lr_diff
+        # Add dictionary and preference words into dictionary
+        self._Pl = preference_l if preference_l else {}
+        self._Pr = preference_r if preference_r else {}
+        self._Dl = self._merge_dictionary(self._Dl, Dl, self._Pl)
+        self._Dr = self._merge_dictionary(self._Dr, Dr, self._Pr)
+
+        self._set_dictionary()
+
+        self._max_lscore_difference = max_lscore_difference
+        self._max_lscore_diffratio = max_lscore_diffratio
+        self._ensurable_score_l = ensurable_score_l
+        self._ensurable_score_lr_diff = ensurable_score_lr_diff
 
     def __call__(self, sent, debug=True, flatten=True):
         return self.tokenize(sent, debug, flatten)
 
+    @property
+    def Dl(self):
+        return self._Dl
+
+    @Dl.setter
+    def Dl(self, Dl):
+        self._Dl = Dl if Dl else {}
+        self._set_dictionary()
+
+    @property
+    def Dr(self):
+        return self._Dr
+
+    @Dr.setter
+    def Dr(self, Dr):
+        self._Dr = Dr if Dr else {}
+        self._set_dictionary()
+
+    # cached results depend on preferences and scoring parameters,
+    # so their setters clear the cache as Dl and Dr do
+    @property
+    def Pl(self):
+        return self._Pl
+
+    @Pl.setter
+    def Pl(self, preference_l):
+        self._Pl = preference_l if preference_l else {}
+        self._Dl = self._merge_dictionary({}, self._Dl, self._Pl)
+        self._set_dictionary()
+
+    @property
+    def Pr(self):
+        return self._Pr
+
+    @Pr.setter
+    def Pr(self, preference_r):
+        self._Pr = preference_r if preference_r else {}
+        self._Dr = self._merge_dictionary({}, self._Dr, self._Pr)
+        self._set_dictionary()
+
+    @property
+    def max_lscore_difference(self):
+        return self._max_lscore_difference
+
+    @max_lscore_difference.setter
+    def max_lscore_difference(self, value):
+        self._max_lscore_difference = value
+        self.clear_cache()
+
+    @property
+    def max_lscore_diffratio(self):
+        return self._max_lscore_diffratio
+
+    @max_lscore_diffratio.setter
+    def max_lscore_diffratio(self, value):
+        self._max_lscore_diffratio = value
+        self.clear_cache()
+
+    @property
+    def ensurable_score_l(self):
+        return self._ensurable_score_l
+
+    @ensurable_score_l.setter
+    def ensurable_score_l(self, value):
+        self._ensurable_score_l = value
+        self.clear_cache()
+
+    @property
+    def ensurable_score_lr_diff(self):
+        return self._ensurable_score_lr_diff
+
+    @ensurable_score_lr_diff.setter
+    def ensurable_score_lr_diff(self, value):
+        self._ensurable_score_lr_diff = value
+        self.clear_cache()
+
+    @staticmethod
+    def _merge_dictionary(base, D, preference):
+        # compiled table is used as it is when nothing is added into it
+        if isinstance(D, CompiledScoreTable):
+            if not base and all(word in D for word in preference):
+                return D
+            D = D.to_dict()
+        # Dictionary type check
+        if not D: D = {}
+        if not type(D) == dict:
+            D = {word:1.0 for word in D}
+        base.update(D)
+        for word in preference:
+            if not (word in base):
+                base[word] = 1.0
+        return base
+
+    def _set_dictionary(self, lmax=None, rmax=None):
+        if lmax is None:
+            lmax = max((len(w) for w in self._Dl)) if self._Dl else 0
+        if rmax is None:
+            rmax = max((len(w) for w in self._Dr)) if self._Dr else 0
+        self.lmax, self.rmax = lmax, rmax
+        self.base_tokenizer = MaxScoreTokenizer(scores=self._Dr)
+        # candidates are found by walking tries instead of probing every substring.
+        # Compiled tables are probed with their hash index, so loading a model builds nothing
+        self._l_trie = None if isinstance(self._Dl, CompiledScoreTable) else Trie(self._Dl)
+        self._r_trie = None if isinstance(self._Dr, CompiledScoreTable) else Trie(self._Dr)
+        self.clear_cache()
+
+    def cache_info(self):
+        return self._cache.info() if self._cache is not None else None
+
+    def clear_cache(self):
+        if self._cache is not None:
+            self._cache.clear()
+
+    def save(self, path):
+        """Save Dl and Dr as compiled tables. Load it with MaxLRScoreTokenizer.load(path).
+        lrgraph is used only to build dictionary, so it is not saved"""
+        params = {
+            'preference_l': {l:float(s) for l, s in self._Pl.items()},
+            'preference_r': {r:float(s) for r, s in self._Pr.items()},
+            'max_lscore_difference': self._max_lscore_difference,
+            'max_lscore_diffratio': self._max_lscore_diffratio,
+            'ensurable_score_l': self._ensurable_score_l,
+            'ensurable_score_lr_diff': self._ensurable_score_lr_diff,
+            'lmax': self.lmax,
+            'rmax': self.rmax
+        }
+        save_model(path, self.__class__.__name__, params, {'Dl': self._Dl, 'Dr': self._Dr})
+
+    @classmethod
+    def load(cls, path, use_mmap=True, cache_size=0):
+        _, params, tables = load_model(path, cls.__name__, use_mmap)
+        return cls._from_model(params, tables, cache_size)
+
+    @classmethod
+    def _from_model(cls, params, tables, cache_size=0):
+        params = dict(params)
+        # models saved without lmax, rmax compute them from tables
+        lmax, rmax = params.pop('lmax', None), params.pop('rmax', None)
+        tokenizer = cls(cache_size=cache_size, **params)
+        # saved Dl already contains preference words
+        tokenizer._Dl, tokenizer._Dr = tables['Dl'], tables['Dr']
+        tokenizer._set_dictionary(lmax, rmax)
+        return tokenizer
+
     def tokenize(self, sent, debug=False, flatten=True):
-        sent_ = [self._tokenize(t, debug) for t in sent.split() if t]
+        sent_ = [self._tokenize_eojeol(t, debug) for t in sent.split() if t]
         if flatten:
             sent_ = [word for words in sent_ for word in words]
         return sent_
 
+    def iter_tokens(self, sent):
+        """It yields same (word, tag) with tokenize(sent) without building token list"""
+        for eojeol in _iter_eojeols(sent):
+            for word in self._tokenize_eojeol(eojeol):
+                yield word
+
+    def _tokenize_eojeol(self, t, debug=False):
+        # debug output has mutable candidates. it is not cached
+        if (self._cache is None) or debug:
+            return self._tokenize(t, debug)
+        return list(self._cache.get_or_compute(t, self._tokenize_as_tuple, t))
+
+    def _tokenize_as_tuple(self, t):
+        return tuple(self._tokenize(t))
+
     def _tokenize(self, t, debug=False):
         candidates = self._initialize(t)
         candidates_ = self._remove_l_subset(candidates)
@@ -306,109 +595,154 @@ class MaxLRScoreTokenizer:
 
     def _initialize_L(self, t):
         n = len(t)
+        if self._l_trie is None:
+            return self._probe_L(t)
+        root = self._l_trie.root
         candidates = []
         for b in range(n):
-            for e in range(b+1, min(n, b+self.lmax)+1):
-                l = t[b:e]
-                if not (l in self.Dl):
-                    continue
-                candidates.append([l,     # 0
-                                   b,     # 1                  
-                                   e,     # 2
-                                   e-b    # 3
-                                  ])
+            node = root
+            for e in range(b, n):
+                node = node.get(t[e])
+                if node is None:
+                    break
+                if '' in node:
+                    candidates.append([t[b:e+1],  # 0
+                                       b,         # 1
+                                       e+1,       # 2
+                                       e+1-b      # 3
+                                      ])
         return candidates
 
-    def _initialize_LR(self, t, candidates):
+    def _probe_L(self, t):
+        # same candidates and order with walking trie
+        n, Dl = len(t), self._Dl
+        return [[t[b:e], b, e, e-b] for b in range(n)
+                for e in range(b+1, min(n, b+self.lmax)+1) if t[b:e] in Dl]
+
+    def _r_ends(self, t, e):
         n = len(t)
+        ends = [e]
+        if self._r_trie is None:
+            Dr = self._Dr
+            ends += [i for i in range(e+1, min(n, e+self.rmax)+1) if t[e:i] in Dr]
+            return ends
+        node = self._r_trie.root
+        for i in range(e, n):
+            node = node.get(t[i])
+            if node is None:
+                break
+            if '' in node:
+                ends.append(i+1)
+        return ends
+
+    def _initialize_LR(self, t, candidates):
         expanded = []
+        # R candidates depend only on the end of L
+        r_ends = {}
         for (l, b, e, len_l) in candidates:
-            for len_r in range(min(self.rmax, n-e)+1):
+            ends = r_ends.get(e)
+            if ends is None:
+                ends = self._r_ends(t, e)
+                r_ends[e] = ends
+            for e_r in ends:
+                len_r = e_r - e
                 if len_l == 1 and len_r == 0:
                     continue
-                r = t[e:e+len_r]
-                if r and not (r in self.Dr):
-                    continue
                 expanded.append([l,
-                                 r,
+                                 t[e:e_r],
                                  b,
                                  e,
-                                 e + len_r,
+                                 e_r,
                                  len_l,
                                  len_r,
                                  len_l + len_r,
                                 ])
         return sorted(expanded, key=lambda x:x[4])
-    
-    def _remove_l_subset(self, candidates):    
+
+    def _remove_l_subset(self, candidates):
         for c in candidates:
             c.append(self.Dl.get(c[0], 0))
             c.append(self.Dr.get(c[1], 0))
         candidates = sorted(candidates, key=lambda x:-x[-2])
 
-        candidates_ = []
-        while candidates:
-            best = candidates.pop(0)
-            b, e, lscore = best[2], best[3], best[-2]
-
-            exist_longer = False
-            for c in candidates:
-                if c[2] > b or c[3] < e or not (c[2] < b or c[3] > e):
+        # A candidate is removed when a candidate ranked after it has longer L
+        # which contains its L and the L scores are similar.
+        # It depends only on L spans, so compare the spans instead of the candidates
+        last_index = {}
+        lscores = {}
+        for i, c in enumerate(candidates):
+            last_index[(c[2], c[3])] = i
+            lscores[(c[2], c[3])] = c[-2]
+
+        begin_to_spans = {}
+        for (b, e), lscore in lscores.items():
+            begin_to_spans.setdefault(b, []).append((e, lscore, last_index[(b, e)]))
+
+        lmax = self.lmax
+        max_diff = self._max_lscore_difference
+        max_diffratio = self._max_lscore_diffratio
+        half_ensurable = self._ensurable_score_l * 0.5
+
+        threshold = {}
+        for (b, e), lscore in lscores.items():
+            max_index = -1
+            # longer L which contains [b, e) begins in [e - lmax, b]
+            for b_ in range(max(0, e - lmax), b + 1):
+                spans = begin_to_spans.get(b_)
+                if spans is None:
                     continue
-                if ((lscore - c[-2]) < self.max_lscore_difference) or \
-                    ((self.ensurable_score_l * 0.5 < lscore) and \
-                        ((lscore+1e-5) / (c[-2]+1e-5) < self.max_lscore_diffratio)):
-                    exist_longer = True
-                    break
-
-            if not exist_longer:
-                candidates_.append(best)
+                for e_, lscore_, index in spans:
+                    if e_ < e or (b_ == b and e_ == e) or index <= max_index:
+                        continue
+                    if ((lscore - lscore_) < max_diff) or \
+                        ((half_ensurable < lscore) and \
+                            ((lscore+1e-5) / (lscore_+1e-5) < max_diffratio)):
+                        max_index = index
+            threshold[(b, e)] = max_index
 
-        return candidates_
+        return [c for i, c in enumerate(candidates) if i >= threshold[(c[2], c[3])]]
 
     def _score(self, candidates):
-        from collections import defaultdict
         # With checking R is overlapped next L
-        begin_to_words = defaultdict(lambda: [])
+        begin_to_words = {}
         for c in candidates:
-            begin_to_words[c[2]].append(c)
-        begin_to_words = dict(begin_to_words)
+            begin_to_words.setdefault(c[2], []).append(c)
 
         scored = []
 
-        candidates = sorted(candidates, key=lambda x:(-x[-2], -x[-1], x[2], -x[5]))
-        while candidates:
-            c = candidates.pop(0)
+        # Scored candidate is appended total score, so word[-2] of the scored word is its R score.
+        # The candidates must be scored in this order
+        for c in sorted(candidates, key=lambda x:(-x[-2], -x[-1], x[2], -x[5])):
             l, r, p0, p1, p2, len_l, len_r, len_lr, score_l, score_r = c
 
             # Check whether R is overlapped next L
-            if len_r:
-                overlappped = False
-                for b in range(p1, p2):
-                    if overlappped:
-                        break
-                    for word in begin_to_words.get(b, []):
-                        score_diff = word[-2] + self.Pl.get(word[0], 0) - score_r
-                        if (self.ensurable_score_l <= word[-2]) or (score_diff > self.ensurable_score_lr_diff):
-                            overlappped = True
-                            break
-                if overlappped:
-                    continue
+            if len_r and self._r_is_overlapped(begin_to_words, p1, p2, score_r):
+                continue
 
-            total_score = (score_l * 2 if not r else score_l + score_r) + self.Pl.get(l, 0) + self.Pr.get(r, 0)
+            total_score = (score_l * 2 if not r else score_l + score_r) + self._Pl.get(l, 0) + self._Pr.get(r, 0)
             c.append(total_score)
             scored.append(c)
         return scored
 
+    def _r_is_overlapped(self, begin_to_words, b, e, score_r):
+        for i in range(b, e):
+            for word in begin_to_words.get(i, ()):
+                score_diff = word[-2] + self._Pl.get(word[0], 0) - score_r
+                if (self._ensurable_score_l <= word[-2]) or (score_diff > self._ensurable_score_lr_diff):
+                    return True
+        return False
+
     def _find_best(self, scores):
+        # Greedy selection of non-overlapped candidates in order of total score.
+        # Selected words are disjoint, so occupied positions are enough for overlap check
         best = []
-        sorted_ = sorted(scores, key=lambda x:-x[-1])
-        while sorted_:
-            best.append(sorted_.pop(0))
-            (b, e) = (best[-1][2], best[-1][4])
-            removals = [i for i, c in enumerate(sorted_) if b < c[4] and e > c[2]] # Overlap
-            for idx in reversed(removals):
-                del sorted_[idx]
+        occupied = set()
+        for c in sorted(scores, key=lambda x:-x[-1]):
+            b, e = c[2], c[4]
+            if any(i in occupied for i in range(b, e)):
+                continue
+            best.append(c)
+            occupied.update(range(b, e))
         return sorted(best, key=lambda x:x[2])
 
     def _postprocessing(self, t, words):
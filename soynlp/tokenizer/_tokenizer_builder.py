@@ -1,8 +1,22 @@
 # -*- encoding:utf8 -*-
 
 from collections import defaultdict
+import heapq
+import os
+import struct
 import sys
+import numpy as np
+from scipy.sparse import csr_matrix
 from soynlp.utils import get_process_memory
+from soynlp.utils import iter_chunks
+from soynlp.utils import map_bounded
+
+
+_MAGIC = b'SOYNLPLR'
+_VERSION = 1
+# magic, version, max_left_length, max_right_length, min_frequency, verbose,
+# number of L, number of R, number of edges, size of L vocabulary, size of R vocabulary
+_HEADER = struct.Struct('<8sQQQQQQQQQQ')
 
 
 class EojeolPatternTrainer:
@@ -16,13 +30,44 @@ class EojeolPatternTrainer:
         self.rlgraph = None
         self.wordset_l = None
         self.wordset_r = None
+        self.rank_l = None
+        self.rank_r = None
     
-    def train(self, sents, wordset_l=None, wordset_r=None):
+    def train(self, sents, wordset_l=None, wordset_r=None, n_jobs=1, chunk_size=10000):
+        """
+        Parameters
+        ----------
+            sents: list-like iterable object which has string
+            wordset_l, wordset_r: set of str. If empty, subwords appeared at least min_frequency are used
+            n_jobs: int. Number of worker processes. If n_jobs <= 0, it uses all cores
+            chunk_size: int. Number of sentences sent to worker at once
+
+        It reads corpus only once. Eojeols are counted first, and then
+        L, R subwords and graphs are derived from the eojeol counter.
+        """
+
+        if n_jobs <= 0:
+            n_jobs = os.cpu_count() or 1
+        eojeols = self._count_eojeols(sents, n_jobs, chunk_size)
         if (not wordset_l) or (not wordset_r):
-            wordset_l, wordset_r = self._scan_vocabulary(sents)
-        self.lrgraph, self.rlgraph = self._build_graph(sents, wordset_l, wordset_r)
+            wordset_l, wordset_r = self._scan_vocabulary_from_eojeols(eojeols, n_jobs)
+        self.lrgraph, self.rlgraph = self._build_graph_from_eojeols(
+            eojeols, wordset_l, wordset_r, n_jobs)
         # TODO more
-        
+
+    def _count_eojeols(self, sents, n_jobs=1, chunk_size=10000):
+        if n_jobs == 1:
+            eojeols = _count_eojeols(sents)
+        else:
+            eojeols = {}
+            for eojeols_ in map_bounded(_count_eojeols, iter_chunks(sents, chunk_size), n_jobs):
+                for eojeol, count in eojeols_.items():
+                    eojeols[eojeol] = eojeols.get(eojeol, 0) + count
+        if self.verbose:
+            print('\rcounting eojeols completed. %d eojeols, memory = %.3f Gb' % (
+                len(eojeols), get_process_memory()))
+        return eojeols
+
     def _scan_vocabulary(self, sents):
         """
         Parameters
@@ -32,27 +77,25 @@ class EojeolPatternTrainer:
         It computes subtoken frequency first. 
         After then, it builds lr-graph with sub-tokens appeared at least min count
         """
-        
-        _ckpt = int(len(sents) / 40)
-        
-        wordset_l = defaultdict(lambda: 0)
-        wordset_r = defaultdict(lambda: 0)
-        
-        for i, sent in enumerate(sents):
-            for token in sent.split(' '):
-                if not token:
-                    continue
-                token_len = len(token)
-                for i in range(1, min(self.max_left_length, token_len)+1):
-                    wordset_l[token[:i]] += 1
-                for i in range(1, min(self.max_right_length, token_len)):
-                    wordset_r[token[-i:]] += 1
-            if self.verbose and (i % _ckpt == 0):
-                args = ('#' * int(i/_ckpt), '-' * (40 - int(i/_ckpt)), 100.0 * i / len(sent), '%', get_process_memory())
-                sys.stdout.write('\rscanning: %s%s (%.3f %s) %.3f Gb' % args)
-            
-        wordset_l = {w for w,f in wordset_l.items() if f >= self.min_frequency}
-        wordset_r = {w for w,f in wordset_r.items() if f >= self.min_frequency}
+        return self._scan_vocabulary_from_eojeols(self._count_eojeols(sents))
+
+    def _scan_vocabulary_from_eojeols(self, eojeols, n_jobs=1):
+        args = [(shard, self.max_left_length, self.max_right_length)
+                for shard in _shard_by_first_char(eojeols, n_jobs)]
+        if n_jobs == 1:
+            results = [_count_subwords(args[0])]
+        else:
+            results = map_bounded(_count_subwords, args, n_jobs)
+
+        # L subwords of shards are disjoint, because they begin with first character of eojeol
+        count_l, count_r = {}, {}
+        for count_l_, count_r_ in results:
+            count_l.update(count_l_)
+            for r, count in count_r_.items():
+                count_r[r] = count_r.get(r, 0) + count
+
+        wordset_l = {w for w,f in count_l.items() if f >= self.min_frequency}
+        wordset_r = {w for w,f in count_r.items() if f >= self.min_frequency}
         if self.verbose:
             print('\rscanning completed')
             print('(L,R) has (%d, %d) tokens. memory = %.3f Gb' % (len(wordset_l), len(wordset_r), get_process_memory()))
@@ -60,37 +103,41 @@ class EojeolPatternTrainer:
         return wordset_l, wordset_r
     
     def _build_graph(self, sents, wordset_l, wordset_r):
+        return self._build_graph_from_eojeols(self._count_eojeols(sents), wordset_l, wordset_r)
+
+    def _build_graph_from_eojeols(self, eojeols, wordset_l, wordset_r, n_jobs=1):
         self.wordset_l = wordset_l
-        self.wordset_r = wordset_r
+        self.wordset_r = set(wordset_r)
         self.wordset_r.add('')
-        _ckpt = int(len(sents) / 40)
-        lrgraph = defaultdict(lambda: defaultdict(lambda: 0))
-        rlgraph = defaultdict(lambda: defaultdict(lambda: 0))
-        
-        for i, sent in enumerate(sents):
-            for token in sent.split():
-                if not token:
-                    continue
-                token_len = len(token)
-                for i in range(1, min(self.max_left_length, token_len)+1):
-                    l = token[:i]
-                    r = token[i:]
-                    if (not l in wordset_l) or (not r in wordset_r):
-                        continue
-                    lrgraph[l][r] += 1
-                    rlgraph[r][l] += 1
-
-            if self.verbose and (i % _ckpt == 0):
-                args = ('#' * int(i/_ckpt), '-' * (40 - int(i/_ckpt)), 100.0 * i / len(sents), '%', get_process_memory())
-                sys.stdout.write('\rbuilding lr-graph: %s%s (%.3f %s), memory = %.3f Gb' % args)
-        if self.verbose:                       
-            sys.stdout.write('\rbuilding lr-graph completed. memory = %.3f Gb' % get_process_memory())
-            
-        lrgraph = {l:{r:f for r,f in rdict.items()} for l,rdict in lrgraph.items()}
-        rlgraph = {r:{l:f for l,f in ldict.items()} for r, ldict in rlgraph.items()}
+
+        args = [(shard, self.wordset_l, self.wordset_r, self.max_left_length)
+                for shard in _shard_by_first_char(eojeols, n_jobs)]
+        if n_jobs == 1:
+            results = [_build_lrgraph(args[0])]
+        else:
+            results = map_bounded(_build_lrgraph, args, n_jobs)
+
+        # L of shards are disjoint, so (l, r) of shards are never overlapped
+        lrgraph, rlgraph = {}, {}
+        for lrgraph_ in results:
+            lrgraph.update(lrgraph_)
+            for l, rdict in lrgraph_.items():
+                for r, f in rdict.items():
+                    ldict = rlgraph.get(r)
+                    if ldict is None:
+                        ldict = {}
+                        rlgraph[r] = ldict
+                    ldict[l] = f
+
+        if self.verbose:
+            print('\rbuilding lr-graph completed. memory = %.3f Gb' % get_process_memory())
         return lrgraph, rlgraph
     
-    def save(self, fname):
+    def save(self, fname, binary=False):
+        """If binary is True, it writes only lrgraph as int arrays with interned vocabularies.
+        load(fname) reads both text and binary format"""
+        if binary:
+            return self._save_binary(fname)
         with open(fname, 'w', encoding='utf-8') as f:
             f.write('%d %d %d %d\n' % (self.max_left_length, self.max_right_length, self.min_frequency, 1 if self.verbose else 0))
             f.write('# lrgraph\n')
@@ -105,6 +152,10 @@ class EojeolPatternTrainer:
                     f.write('  - %s: %d\n' % (l, freq))
             
     def load(self, fname):
+        with open(fname, 'rb') as f:
+            is_binary = (f.read(len(_MAGIC)) == _MAGIC)
+        if is_binary:
+            return self._load_binary(fname)
         with open(fname, encoding='utf-8') as f:
             param = next(f).strip()
             args = param.split()
@@ -158,40 +209,116 @@ class EojeolPatternTrainer:
             self.lrgraph = lrgraph
             self.rlgraph = rlgraph
             
-    def train_hits(lrgraph=None, rlgraph=None, sum_of_rank=10000, decaying_factor=0.9, max_iter=10, tolerance=0.0001):
-        def normalize(g, sum_of_rank, df):
-            factor = df * sum_of_rank / sum(g.values())
-            restart = (1 - df) * sum_of_rank / len(g)
-            g_ = {word:(factor*rank + restart) for word, rank in g.items() if word != ''}
-            return g_
-
-        if lrgraph == None:
+    def _save_binary(self, fname):
+        idx2l = list(self.lrgraph)
+        r2idx = {}
+        indptr = np.zeros(len(idx2l) + 1, dtype=np.int64)
+        indices, data = [], []
+        for i, rdict in enumerate(self.lrgraph.values()):
+            for r, freq in rdict.items():
+                r_idx = r2idx.get(r)
+                if r_idx is None:
+                    r_idx = len(r2idx)
+                    r2idx[r] = r_idx
+                indices.append(r_idx)
+                data.append(freq)
+            indptr[i+1] = len(indices)
+        idx2r = [None] * len(r2idx)
+        for r, idx in r2idx.items():
+            idx2r[idx] = r
+
+        # subwords come from str.split(), so they never have line separator
+        vocab_l = '\n'.join(idx2l).encode('utf-8')
+        vocab_r = '\n'.join(idx2r).encode('utf-8')
+        header = _HEADER.pack(_MAGIC, _VERSION, self.max_left_length, self.max_right_length,
+            self.min_frequency, 1 if self.verbose else 0, len(idx2l), len(idx2r), len(indices),
+            len(vocab_l), len(vocab_r))
+
+        dirname = os.path.dirname(fname)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname)
+        with open(fname, 'wb') as f:
+            f.write(header)
+            f.write(vocab_l)
+            f.write(vocab_r)
+            f.write(indptr.tobytes())
+            f.write(np.asarray(indices, dtype=np.int32).tobytes())
+            f.write(np.asarray(data, dtype=np.int64).tobytes())
+
+    def _load_binary(self, fname):
+        with open(fname, 'rb') as f:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise ValueError('%s is broken. It is shorter than header' % fname)
+            (_, version, max_left_length, max_right_length, min_frequency, verbose,
+                n_l, n_r, n_edges, vocab_l_size, vocab_r_size) = _HEADER.unpack(header)
+            if version != _VERSION:
+                raise ValueError('Graph format version %d is not supported. Expected %d' % (version, _VERSION))
+            idx2l = f.read(vocab_l_size).decode('utf-8').split('\n') if n_l > 0 else []
+            idx2r = f.read(vocab_r_size).decode('utf-8').split('\n') if n_r > 0 else []
+            indptr = np.frombuffer(f.read(8 * (n_l + 1)), dtype=np.int64)
+            indices = np.frombuffer(f.read(4 * n_edges), dtype=np.int32)
+            data = np.frombuffer(f.read(8 * n_edges), dtype=np.int64)
+        if len(idx2l) != n_l or len(idx2r) != n_r or len(data) != n_edges:
+            raise ValueError('%s is broken. Vocabulary or graph size is different with header' % fname)
+
+        self.max_left_length = max_left_length
+        self.max_right_length = max_right_length
+        self.min_frequency = min_frequency
+        self.verbose = (verbose == 1)
+
+        # rlgraph is the transpose of lrgraph
+        matrix = csr_matrix((data, indices, indptr), shape=(n_l, n_r))
+        self.lrgraph = _csr_to_graph(indptr, indices, data, idx2l, idx2r)
+        transposed = matrix.tocsc()
+        self.rlgraph = _csr_to_graph(transposed.indptr, transposed.indices, transposed.data, idx2r, idx2l)
+        self.wordset_l = set(self.lrgraph.keys())
+        self.wordset_r = set(self.rlgraph.keys())
+
+    def train_hits(self, lrgraph=None, rlgraph=None, sum_of_rank=10000,
+        decaying_factor=0.9, max_iter=10, tolerance=0.0001):
+        """
+        Parameters
+        ----------
+            lrgraph: dict of dict {l:{r:frequency}}. Default is trained self.lrgraph
+            rlgraph: dict of dict {r:{l:frequency}}. Default is trained self.rlgraph
+                It is used only to add R words which are not in lrgraph
+            sum_of_rank: float. Sum of ranks of L (and R) words
+            decaying_factor: float. 1 - decaying_factor is restart probability
+            max_iter: int
+            tolerance: float. Iteration stops when L1 difference of ranks < sum_of_rank * tolerance
+
+        It computes HITS of L and R words on L-R graph with sparse matrix power iteration.
+        Empty R ('') is not ranked. Ranks are stored as self.rank_l and self.rank_r
+        and also returned as dict.
+        """
+
+        if lrgraph is None:
             (lrgraph, rlgraph) = (self.lrgraph, self.rlgraph)
-        
-        rank = sum_of_rank / len(lrgraph)
-        rank_l = {l:rank for l in lrgraph.keys()}
-        rank = sum_of_rank / len(rlgraph)
-        rank_r = {r:rank for r in rlgraph.keys() if r != ''}
+        if not lrgraph:
+            raise ValueError('lrgraph is empty. Train EojeolPatternTrainer first')
+
+        matrix, idx2l, idx2r = _graph_to_matrix(lrgraph, rlgraph)
+        n_l, n_r = matrix.shape
+        matrix_t = matrix.T.tocsr()
+
+        def normalize(rank):
+            total = rank.sum()
+            factor = decaying_factor * sum_of_rank / total if total > 0 else 0
+            restart = (1 - decaying_factor) * sum_of_rank / rank.shape[0]
+            return factor * rank + restart
+
+        rank_l = np.full(n_l, sum_of_rank / n_l)
+        rank_r = np.full(n_r, sum_of_rank / n_r) if n_r > 0 else np.zeros(0)
 
         for n_iter in range(max_iter):
-            next_rank_l = {}
-            for l, rdict in lrgraph.items():
-                sum_rrank = sum({freq*rank_r[r] for r, freq in rdict.items() if r != ''})
-                next_rank_l[l] = sum_rrank
-            next_rank_l = normalize(next_rank_l, sum_of_rank, decaying_factor)
-
-            next_rank_r = {}
-            for r, ldict in rlgraph.items():
-                if r == '': continue
-                sum_lrank = sum({freq*rank_l[l] for l, freq in ldict.items()})
-                next_rank_r[r] = sum_lrank
-            next_rank_r = normalize(next_rank_r, sum_of_rank, decaying_factor)
+            next_rank_l = normalize(matrix.dot(rank_r))
+            next_rank_r = normalize(matrix_t.dot(rank_l)) if n_r > 0 else rank_r
 
             if self.verbose:
                 sys.stdout.write('\rtrain hits ... %d in %d' % (n_iter+1, max_iter))
 
-            diff = sum([abs(rank - next_rank_l[w]) for w, rank in rank_l.items()])
-            diff += sum([abs(rank - next_rank_r[w]) for w, rank in rank_r.items()])
+            diff = np.abs(rank_l - next_rank_l).sum() + np.abs(rank_r - next_rank_r).sum()
             rank_l = next_rank_l
             rank_r = next_rank_r
             if diff < (sum_of_rank * tolerance):
@@ -202,4 +329,101 @@ class EojeolPatternTrainer:
         if self.verbose:
             print('\rcomputation was done at %d iteration' % (n_iter+1))
 
-        return rank_l, rank_r
+        self.rank_l = dict(zip(idx2l, rank_l.tolist()))
+        self.rank_r = dict(zip(idx2r, rank_r.tolist()))
+        return self.rank_l, self.rank_r
+
+def _csr_to_graph(indptr, indices, data, idx2row, idx2col):
+    indptr = indptr.tolist()
+    pairs = list(zip(map(idx2col.__getitem__, indices.tolist()), data.tolist()))
+    return {row:dict(pairs[b:e]) for row, b, e in zip(idx2row, indptr, indptr[1:])}
+
+def _graph_to_matrix(lrgraph, rlgraph=None):
+    """It returns (L x R) frequency matrix as scipy.sparse.csr_matrix, idx2l and idx2r.
+    Empty R ('') is excluded"""
+
+    idx2l = list(lrgraph)
+    r2idx = {}
+    if rlgraph:
+        for r in rlgraph:
+            if r and not (r in r2idx):
+                r2idx[r] = len(r2idx)
+
+    n_edges = sum(len(rdict) for rdict in lrgraph.values())
+    rows = np.zeros(n_edges, dtype=np.int32)
+    cols = np.zeros(n_edges, dtype=np.int32)
+    data = np.zeros(n_edges, dtype=np.float64)
+    i = 0
+    for l_idx, rdict in enumerate(lrgraph.values()):
+        for r, freq in rdict.items():
+            if not r:
+                continue
+            r_idx = r2idx.get(r)
+            if r_idx is None:
+                r_idx = len(r2idx)
+                r2idx[r] = r_idx
+            rows[i] = l_idx
+            cols[i] = r_idx
+            data[i] = freq
+            i += 1
+
+    idx2r = [None] * len(r2idx)
+    for r, idx in r2idx.items():
+        idx2r[idx] = r
+    matrix = csr_matrix((data[:i], (rows[:i], cols[:i])), shape=(len(idx2l), len(idx2r)))
+    return matrix, idx2l, idx2r
+
+def _count_eojeols(sents):
+    eojeols = {}
+    for sent in sents:
+        for eojeol in sent.split():
+            eojeols[eojeol] = eojeols.get(eojeol, 0) + 1
+    return eojeols
+
+def _shard_by_first_char(eojeols, n_shards):
+    # The largest first character group goes to the smallest shard. Ties are broken
+    # by character, so shards do not depend on PYTHONHASHSEED
+    if n_shards == 1:
+        return [eojeols]
+    sizes = {}
+    for eojeol in eojeols:
+        sizes[eojeol[0]] = sizes.get(eojeol[0], 0) + 1
+    heap = [(0, i) for i in range(n_shards)]
+    shard_of = {}
+    for char, size in sorted(sizes.items(), key=lambda x:(-x[1], x[0])):
+        size_, i = heapq.heappop(heap)
+        shard_of[char] = i
+        heapq.heappush(heap, (size_ + size, i))
+    shards = [{} for _ in range(n_shards)]
+    for eojeol, count in eojeols.items():
+        shards[shard_of[eojeol[0]]][eojeol] = count
+    return shards
+
+def _count_subwords(args):
+    eojeols, max_left_length, max_right_length = args
+    count_l, count_r = {}, {}
+    for eojeol, count in eojeols.items():
+        n = len(eojeol)
+        for i in range(1, min(max_left_length, n)+1):
+            l = eojeol[:i]
+            count_l[l] = count_l.get(l, 0) + count
+        for i in range(1, min(max_right_length, n)):
+            r = eojeol[-i:]
+            count_r[r] = count_r.get(r, 0) + count
+    return count_l, count_r
+
+def _build_lrgraph(args):
+    eojeols, wordset_l, wordset_r, max_left_length = args
+    lrgraph = {}
+    for eojeol, count in eojeols.items():
+        for i in range(1, min(max_left_length, len(eojeol))+1):
+            l = eojeol[:i]
+            r = eojeol[i:]
+            if (not l in wordset_l) or (not r in wordset_r):
+                continue
+            rdict = lrgraph.get(l)
+            if rdict is None:
+                rdict = {}
+                lrgraph[l] = rdict
+            rdict[r] = rdict.get(r, 0) + count
+    return lrgraph
@@ -7,13 +7,19 @@ from .utils import check_corpus
 from .utils import DoublespaceLineCorpus
 from .utils import EojeolCounter
 from .utils import LRGraph
+from .utils import NormalizedLRGraph
+from .trie import Trie
 from .math import svd
+from .parallel import iter_chunks
+from .parallel import map_bounded
 
 __all__ = [
     # utils
     'get_available_memory', 'get_process_memory', 'check_dirs'
     'sort_by_alphabet', 'most_similar', 'DoublespaceLineCorpus',
-    'EojeolCounter', 'LRGraph',
+    'EojeolCounter', 'LRGraph', 'NormalizedLRGraph', 'Trie',
     # math
-    'svd'
+    'svd',
+    # parallel
+    'iter_chunks', 'map_bounded'
 ]
\ No newline at end of file
@@ -0,0 +1,40 @@
+from collections import deque
+import multiprocessing
+
+
+def iter_chunks(iterable, chunk_size):
+    """It yields lists of chunk_size items of iterable. The last one may be shorter"""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def map_bounded(func, args, n_jobs, initializer=None, initargs=()):
+    """It yields func(arg) of each arg in args computed in n_jobs worker processes,
+    in the order of args. At most 2 * n_jobs tasks are in flight, so memory is
+    bounded even if args is a lazy iterator over large corpus.
+
+    Arguments
+    ---------
+    func : callable
+        Picklable function which takes one argument
+    args : iterable
+        Arguments of func. It is consumed lazily
+    n_jobs : int
+        Number of worker processes
+    initializer, initargs :
+        Same with multiprocessing.Pool. Use it to send large objects to each worker only once
+    """
+    max_pending = 2 * n_jobs
+    with multiprocessing.Pool(n_jobs, initializer=initializer, initargs=initargs) as pool:
+        pending = deque()
+        for arg in args:
+            pending.append(pool.apply_async(func, (arg,)))
+            if len(pending) >= max_pending:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
@@ -0,0 +1,71 @@
+class Trie:
+    """Character trie with nested dict nodes.
+
+    Each node is a dict of {character: child node}. A node of registered word
+    has its value with empty str key, because character key is never empty.
+
+    Usage
+
+        trie = Trie({'데이': 0.35, '데이터': 0.4})
+        list(trie.prefixes('데이터센터'))
+        $ [(2, 0.35), (3, 0.4)]
+    """
+
+    def __init__(self, words=None):
+        self.root = {}
+        self.max_length = 0
+        self._size = 0
+        if words:
+            if hasattr(words, 'items'):
+                for word, value in words.items():
+                    self.insert(word, value)
+            else:
+                for word in words:
+                    self.insert(word)
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, word):
+        node = self._find_node(word)
+        return (node is not None) and ('' in node)
+
+    def insert(self, word, value=True):
+        node = self.root
+        for char in word:
+            child = node.get(char)
+            if child is None:
+                child = {}
+                node[char] = child
+            node = child
+        if not ('' in node):
+            self._size += 1
+        node[''] = value
+        self.max_length = max(self.max_length, len(word))
+
+    def get(self, word, default=None):
+        node = self._find_node(word)
+        if (node is None) or not ('' in node):
+            return default
+        return node['']
+
+    def _find_node(self, word):
+        node = self.root
+        for char in word:
+            node = node.get(char)
+            if node is None:
+                return None
+        return node
+
+    def prefixes(self, s, begin=0, max_length=0):
+        """It yields (end, value) of registered words s[begin:end] in increasing end order.
+        Empty word is not yielded."""
+
+        node = self.root
+        end = len(s) if max_length <= 0 else min(len(s), begin + max_length)
+        for i in range(begin, end):
+            node = node.get(s[i])
+            if node is None:
+                return
+            if '' in node:
+                yield i + 1, node['']
@@ -4,6 +4,7 @@ import os
 import psutil
 import sys
 from collections import defaultdict
+from itertools import count
 from sklearn.metrics import pairwise_distances
 
 
@@ -315,6 +316,9 @@ class EojeolCounter:
                 self._counter[word] = int(count)
         self._count_sum = sum(self._counter.values())
 
+# version of LRGraph state. LRGraph is same with its origin when _version == _origin_version
+_lrgraph_versions = count(1)
+
 class LRGraph:
 
     def __init__(self, lrgraph=None, sents=None, l_max_length=10, r_max_length=9):
@@ -337,6 +341,7 @@ class LRGraph:
 
         self._lr_origin = {l:{r:c for r,c in rdict.items()}
                            for l,rdict in self._lr.items()}
+        self._origin_version = self._version = 0
 
     def _construct_graph(self, sents):
         lrgraph = defaultdict(lambda: defaultdict(int))
@@ -381,8 +386,10 @@ class LRGraph:
             {l:{r:c for r,c in rdict.items()}
              for l, rdict in self._lr_origin.items()}
         )
+        self._version = getattr(self, '_origin_version', 0)
 
     def add_lr_pair(self, l, r, count=1):
+        self._version = next(_lrgraph_versions)
         self._lr[l][r] += count
         if r:
             self._rl[r][l] += count
@@ -393,6 +400,7 @@ class LRGraph:
             self.add_lr_pair(l, r, count)
 
     def remove_lr_pair(self, l, r, count=1):
+        self._version = next(_lrgraph_versions)
         if l in self._lr:
             rdict = self._lr[l]
             if r in rdict:
@@ -415,6 +423,53 @@ class LRGraph:
             l, r = eojeol[:i], eojeol[i:]
             self.remove_lr_pair(l, r, count)
 
+    def add_eojeols(self, eojeols):
+        """Add (eojeol, count) pairs to both of current and original graph.
+        Eojeols are split with same length limits of EojeolCounter.to_lrgraph"""
+        pristine = self._version == getattr(self, '_origin_version', 0)
+        lr, rl, lr_origin = self._lr, self._rl, self._lr_origin
+        for eojeol, count in eojeols:
+            for e in range(1, min(self.l_max_length, len(eojeol)) + 1):
+                l, r = eojeol[:e], eojeol[e:]
+                if len(r) > self.r_max_length:
+                    continue
+                rdict = lr_origin.setdefault(l, {})
+                rdict[r] = rdict.get(r, 0) + count
+                rdict = lr.setdefault(l, {})
+                rdict[r] = rdict.get(r, 0) + count
+                if r:
+                    ldict = rl.setdefault(r, {})
+                    ldict[l] = ldict.get(l, 0) + count
+        self._version = next(_lrgraph_versions)
+        self._origin_version = self._version if pristine else next(_lrgraph_versions)
+
+    def remove_eojeols(self, eojeols):
+        """Same with remove_eojeol(eojeol, count) for each (eojeol, count) in eojeols,
+        without method call for each (L, R) pair"""
+        self._version = next(_lrgraph_versions)
+        lr, rl = self._lr, self._rl
+        for eojeol, count in eojeols:
+            for i in range(1, len(eojeol) + 1):
+                l, r = eojeol[:i], eojeol[i:]
+                rdict = lr.get(l)
+                if rdict is not None and r in rdict:
+                    c = rdict[r] - count
+                    if c <= 0:
+                        del rdict[r]
+                        if not rdict:
+                            del lr[l]
+                    else:
+                        rdict[r] = c
+                ldict = rl.get(r)
+                if ldict is not None and l in ldict:
+                    c = ldict[l] - count
+                    if c <= 0:
+                        del ldict[l]
+                        if not ldict:
+                            del rl[r]
+                    else:
+                        ldict[l] = c
+
     def get_r(self, l, topk=10):
         rlist = sorted(self._lr.get(l, {}).items(), key=lambda x:-x[1])
         if topk > 0:
@@ -486,3 +541,66 @@ class LRGraph:
         self._lr, self._rl = self._check_lrgraph(
             {l:{r:c for r,c in rdict.items()}
              for l,rdict in self._lr_origin.items()})
+        self._origin_version = self._version = next(_lrgraph_versions)
+
+class NormalizedLRGraph:
+    """Read-only view of L-R graph which gives P(R|L) on demand.
+
+    Sum of R counts of each L is computed when the L is accessed first,
+    and memoized. Normalized graph is not stored, so initialization is instant
+    and memory is bounded by the number of accessed L.
+
+    Arguments
+    ---------
+    lrgraph : dict of dict
+        {l: {r: count}}
+    totals : dict or None
+        {l: sum of r counts}. If it is given, it is used as memo
+
+    Usage
+
+        lrgraph_norm = NormalizedLRGraph({'너무': {'': 3, '나': 1}})
+        lrgraph_norm.prob('너무', '나')
+        $ 0.25
+        lrgraph_norm.get('너무', {})
+        $ {'': 0.75, '나': 0.25}
+    """
+
+    def __init__(self, lrgraph, totals=None):
+        self._lrgraph = lrgraph
+        self._totals = totals if totals is not None else {}
+
+    def __len__(self):
+        return len(self._lrgraph)
+
+    def __contains__(self, l):
+        return l in self._lrgraph
+
+    def __iter__(self):
+        return iter(self._lrgraph)
+
+    def __getitem__(self, l):
+        if not (l in self._lrgraph):
+            raise KeyError(l)
+        return self.get(l)
+
+    def total(self, l):
+        total = self._totals.get(l)
+        if total is None:
+            total = sum(self._lrgraph.get(l, {}).values())
+            self._totals[l] = total
+        return total
+
+    def prob(self, l, r, default=0):
+        count = self._lrgraph.get(l, {}).get(r, 0)
+        if not count:
+            return default
+        return count / self.total(l)
+
+    def get(self, l, default=None):
+        """It returns normalized {r: prob} of l. The dict is created for each call"""
+        rdict = self._lrgraph.get(l)
+        if rdict is None:
+            return default
+        sum_ = self.total(l)
+        return {r:c/sum_ for r,c in rdict.items()}
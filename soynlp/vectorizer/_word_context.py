@@ -73,6 +73,9 @@ def _word_context(sents, windows, tokenizer, dynamic_weight, verbose, vocab2idx)
             _print_status('  - scanning (word, context) pairs', i_sent)
 
         words = tokenizer(sent)
+        # contexts are accessed by index. tokenizer may return generator
+        if not isinstance(words, list):
+            words = list(words)
         if not words:
             continue
 
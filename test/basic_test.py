@@ -1,7 +1,9 @@
 # -*- encoding:utf8 -*-
 
 import argparse
+import os
 import sys
+import tempfile
 sys.path.append('../')
 import soynlp
 
@@ -92,6 +94,203 @@ def tokenizer_test():
         raise ValueError("maxscore_tokenizer.tokenize('데이터는 데이터센터의 데이데이') == {}".format(
             maxscore_tokenizer.tokenize('데이터는 데이터센터의 데이데이')))
 
+    cached_tokenizer = MaxScoreTokenizer({'데이터':0.4, '데이':0.35, '데이터센터':0.38}, cache_size=3)
+    for _ in range(2):
+        tokens = cached_tokenizer.tokenize('데이터는 데이터센터의 데이데이')
+    if not (tokens == ['데이터', '는', '데이터', '센터의', '데이', '데이']):
+        raise ValueError("cached_tokenizer.tokenize('데이터는 데이터센터의 데이데이') == {}".format(tokens))
+    if not (cached_tokenizer.cache_info() == (3, 3, 3, 3)):
+        raise ValueError("cached_tokenizer.cache_info() == {}".format(cached_tokenizer.cache_info()))
+    cached_tokenizer.scores = {'데이터센터':1.0}
+    if not (cached_tokenizer.tokenize('데이터센터의') == ['데이터센터', '의']):
+        raise ValueError("cache was not invalidated. {}".format(cached_tokenizer.tokenize('데이터센터의')))
+
+    # result computed before clear() is not stored
+    from soynlp.tokenizer._cache import EojeolCache
+    cache = EojeolCache(max_size=3)
+    def clear_during_compute(eojeol):
+        cache.clear()
+        return ('stale',)
+    cache.get_or_compute('데이터는요', clear_during_compute, '데이터는요')
+    if '데이터는요' in cache:
+        raise ValueError("EojeolCache stored the result computed before clear()")
+
+    from soynlp.tokenizer import NounLMatchTokenizer
+    noun_tokenizer = NounLMatchTokenizer({'데이터', '데이', '센터', '데이터센터'})
+    tokens = noun_tokenizer.tokenize('데이터센터의 데이데이 센터에서', compose_compound=False)
+    if not (tokens == ['데이터센터', '데이', '데이', '센터']):
+        raise ValueError("noun_tokenizer.tokenize('데이터센터의 데이데이 센터에서') == {}".format(tokens))
+
+    # nouns of new lengths are found after nouns is set again
+    replaced_tokenizer = NounLMatchTokenizer({'데이'})
+    replaced_tokenizer.nouns = {'데이', '센터에서'}
+    tokens = replaced_tokenizer.tokenize('데이데이 센터에서')
+    if not (tokens == ['데이데이', '센터에서']):
+        raise ValueError("tokenize('데이데이 센터에서') after setting nouns == {}".format(tokens))
+
+    from soynlp.tokenizer import MaxLRScoreTokenizer
+    maxlr_tokenizer = MaxLRScoreTokenizer(
+        Dl={'파스타':0.7, '파스':0.5, '좋아':0.4, '맛있':0.6},
+        Dr={'가':0.5, '는':0.5, '요':0.3, '했어요':0.4})
+    tokens = maxlr_tokenizer.tokenize('파스타가 파스타는맛있어')
+    if not (tokens == [('파스타', 'L'), ('가', 'R'), ('파스타', 'L'), ('는', 'R'), ('맛있', 'L'), ('어', 'L')]):
+        raise ValueError("maxlr_tokenizer.tokenize('파스타가 파스타는맛있어') == {}".format(tokens))
+
+    # changing preferences clears cached results
+    cached_maxlr = MaxLRScoreTokenizer(
+        Dl={'파스타':0.7, '파스':0.5, '좋아':0.4, '맛있':0.6},
+        Dr={'가':0.5, '는':0.5, '요':0.3, '했어요':0.4}, cache_size=100)
+    cached_maxlr.tokenize('파스타가 파스타는맛있어')
+    cached_maxlr.Pl = {'파스':1.0}
+    tokens = cached_maxlr.tokenize('파스타가 파스타는맛있어')
+    if not (tokens[0] == ('파스', 'L')):
+        raise ValueError("tokenize('파스타가 파스타는맛있어') after setting Pl == {}".format(tokens))
+
+    sentence = ' 데이터는  데이터센터의\t데이데이 abc123 '
+    for tokenizer in [regex_tokenizer, ltokenizer, maxscore_tokenizer, noun_tokenizer]:
+        starts, ends = tokenizer.tokenize_spans(sentence)
+        tokens = [sentence[b:e] for b, e in zip(starts, ends)]
+        if not (tokens == tokenizer.tokenize(sentence)):
+            raise ValueError("{}.tokenize_spans(sentence) == {}".format(
+                tokenizer.__class__.__name__, (starts, ends)))
+
+    for tokenizer in [regex_tokenizer, ltokenizer, maxscore_tokenizer, noun_tokenizer, maxlr_tokenizer]:
+        tokens = [list(tokens) for tokens in tokenizer.iter_corpus([sentence, '파스타가 파스타는맛있어'])]
+        if not (tokens == [tokenizer.tokenize(sentence), tokenizer.tokenize('파스타가 파스타는맛있어')]):
+            raise ValueError("{}.iter_corpus(corpus) == {}".format(tokenizer.__class__.__name__, tokens))
+
+    import threading
+    from soynlp.tokenizer import TokenizerServer
+    from soynlp.tokenizer import TokenizerClient
+    with tempfile.TemporaryDirectory() as dirname:
+        server = TokenizerServer(maxscore_tokenizer, n_jobs=1)
+        thread = threading.Thread(target=server.serve, kwargs={'path': os.path.join(dirname, 'server.sock')})
+        thread.start()
+        server.wait_until_ready(timeout=30)
+        with TokenizerClient(path=os.path.join(dirname, 'server.sock')) as client:
+            tokens = client.tokenize('데이터는 데이터센터의 데이데이')
+            stats = client.stats()
+        server.shutdown()
+        thread.join()
+    if not (tokens == maxscore_tokenizer.tokenize('데이터는 데이터센터의 데이데이') and stats['requests'] == 1):
+        raise ValueError("TokenizerClient.tokenize('데이터는 데이터센터의 데이데이') == {}, {}".format(tokens, stats))
+
+    # requests read before shutdown() are answered before their connections are closed
+    import json
+    import socket
+    import time
+    with tempfile.TemporaryDirectory() as dirname:
+        server = TokenizerServer(maxscore_tokenizer, n_jobs=1, max_delay=0.5)
+        thread = threading.Thread(target=server.serve, kwargs={'path': os.path.join(dirname, 'server.sock')})
+        thread.start()
+        server.wait_until_ready(timeout=30)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(30)
+            sock.connect(os.path.join(dirname, 'server.sock'))
+            sock.sendall(json.dumps({'id': 0, 'sentence': '데이터는 데이터센터의'}).encode('utf-8') + b'\n')
+            time.sleep(0.1)
+            server.shutdown()
+            with sock.makefile('rb') as f:
+                lines = f.readlines()
+        thread.join()
+    if not (len(lines) == 1 and json.loads(lines[0].decode('utf-8'))['result'] == maxscore_tokenizer.tokenize('데이터는 데이터센터의')):
+        raise ValueError("TokenizerServer.shutdown() during request answered {}".format(lines))
+
+    from soynlp.tokenizer import normalize
+    normalized = normalize('앜ㅋㅋㅋㅋ  ㅋ쿠ㅜㅜ 와하하하하하하하 abcabcabcabc')
+    if not (normalized == '아ㅋㅋ ㅋㅋㅜㅜㅜ 와하하 abcabc'):
+        raise ValueError("normalize('앜ㅋㅋㅋㅋ  ㅋ쿠ㅜㅜ 와하하하하하하하 abcabcabcabc') == {}".format(normalized))
+
+    from soynlp.tokenizer._tokenizer_builder import EojeolPatternTrainer
+    trainer = EojeolPatternTrainer(verbose=False)
+    rank_l, rank_r = trainer.train_hits(
+        lrgraph={'데이터':{'는':3, '가':2, '':1}, '센터':{'는':1, '':2}}, max_iter=30)
+    if not (rank_l['데이터'] > rank_l['센터'] and rank_r['는'] > rank_r['가'] and not ('' in rank_r)):
+        raise ValueError("trainer.train_hits() == {}, {}".format(rank_l, rank_r))
+
+    trainer = EojeolPatternTrainer(min_frequency=2, verbose=False)
+    trainer.train(['데이터는 데이터센터의 데이데이', '데이터센터 데이터', '센터의 데이터는'] * 5)
+    sharded_trainer = EojeolPatternTrainer(min_frequency=2, verbose=False)
+    sharded_trainer.train(['데이터는 데이터센터의 데이데이', '데이터센터 데이터', '센터의 데이터는'] * 5,
+        n_jobs=2, chunk_size=4)
+    if not (trainer.lrgraph == sharded_trainer.lrgraph and trainer.rlgraph == sharded_trainer.rlgraph):
+        raise ValueError("EojeolPatternTrainer.train(n_jobs=2).lrgraph == {}".format(sharded_trainer.lrgraph))
+
+    # shards do not depend on PYTHONHASHSEED
+    from soynlp.tokenizer._tokenizer_builder import _shard_by_first_char
+    shards = _shard_by_first_char({'가나': 1, '가다': 2, '나': 1, '다': 3}, 2)
+    if not (shards == [{'가나': 1, '가다': 2}, {'나': 1, '다': 3}]):
+        raise ValueError("_shard_by_first_char(eojeols, 2) == {}".format(shards))
+
+    with tempfile.TemporaryDirectory() as dirname:
+        path = os.path.join(dirname, 'lrgraph.bin')
+        trainer.save(path, binary=True)
+        loaded_trainer = EojeolPatternTrainer()
+        loaded_trainer.load(path)
+    if not (loaded_trainer.lrgraph == trainer.lrgraph and loaded_trainer.rlgraph == trainer.rlgraph):
+        raise ValueError("loaded EojeolPatternTrainer.lrgraph == {}".format(loaded_trainer.lrgraph))
+
+    sents = ['데이터는 데이터센터의 데이데이', '데이터센터 데이터', '센터의 데이터는'] * 5
+    tokenized = list(maxscore_tokenizer.tokenize_corpus(sents, n_jobs=2, chunk_size=2))
+    if not (tokenized == [maxscore_tokenizer.tokenize(sent) for sent in sents]):
+        raise ValueError("maxscore_tokenizer.tokenize_corpus(sents, n_jobs=2) == {}".format(tokenized))
+
+    with tempfile.TemporaryDirectory() as dirname:
+        path = os.path.join(dirname, 'tokenized.txt')
+        maxlr_tokenizer.tokenize_corpus(['파스타가 파스타는맛있어'], output_path=path)
+        with open(path, encoding='utf-8') as f:
+            written = f.read()
+    if not (written == '파스타/L 가/R 파스타/L 는/R 맛있/L 어/L\n'):
+        raise ValueError("maxlr_tokenizer.tokenize_corpus(sents, output_path=path) wrote {}".format(written))
+
+    from soynlp.tokenizer import CompiledScoreTable
+    table = CompiledScoreTable.from_dict({'데이터':0.4, '데이':0.35, '데이터센터':0.38})
+    if not (table.to_dict() == {'데이터':0.4, '데이':0.35, '데이터센터':0.38}):
+        raise ValueError("CompiledScoreTable.to_dict() == {}".format(table.to_dict()))
+    compiled_tokenizer = MaxScoreTokenizer(scores=table)
+    if not (compiled_tokenizer.tokenize('데이터는 데이터센터의 데이데이')
+            == maxscore_tokenizer.tokenize('데이터는 데이터센터의 데이데이')):
+        raise ValueError("compiled_tokenizer.tokenize('데이터는 데이터센터의 데이데이') == {}".format(
+            compiled_tokenizer.tokenize('데이터는 데이터센터의 데이데이')))
+
+    # compiled Dl, Dr are used as they are, not replaced with {word: 1.0}
+    compiled_maxlr = MaxLRScoreTokenizer(
+        Dl=CompiledScoreTable.from_dict({'파스타':0.7, '파스':0.5, '좋아':0.4, '맛있':0.6}),
+        Dr=CompiledScoreTable.from_dict({'가':0.5, '는':0.5, '요':0.3, '했어요':0.4}))
+    if not (isinstance(compiled_maxlr.Dl, CompiledScoreTable) and
+            compiled_maxlr.tokenize('파스타가 파스타는맛있어') == maxlr_tokenizer.tokenize('파스타가 파스타는맛있어')):
+        raise ValueError("MaxLRScoreTokenizer(compiled Dl, Dr).tokenize('파스타가 파스타는맛있어') == {}".format(
+            compiled_maxlr.tokenize('파스타가 파스타는맛있어')))
+
+    # shared table is not removed when other attaching process exits
+    import subprocess
+    shared = table.to_shared_memory()
+    try:
+        root = os.path.dirname(os.path.dirname(os.path.abspath(soynlp.__file__)))
+        code = ('import sys; sys.path.insert(0, {!r}); from soynlp.tokenizer import CompiledScoreTable; '
+                'print(CompiledScoreTable.attach({!r})["데이터"])').format(root, shared._shm.name)
+        # second process can attach after first attaching process exited
+        outputs = [subprocess.run([sys.executable, '-c', code], stdout=subprocess.PIPE).stdout.strip()
+                   for _ in range(2)]
+        if not (outputs == [b'0.4', b'0.4']):
+            raise ValueError("CompiledScoreTable.attach(name) in other processes == {}".format(outputs))
+    finally:
+        shared.unlink()
+
+    from soynlp.tokenizer import load_tokenizer
+    with tempfile.TemporaryDirectory() as dirname:
+        for tokenizer in [ltokenizer, maxscore_tokenizer, maxlr_tokenizer]:
+            path = os.path.join(dirname, 'tokenizer.model')
+            tokenizer.save(path)
+            loaded = load_tokenizer(path, use_mmap=False)
+            if not (loaded.tokenize('데이터는 데이터센터의 파스타는맛있어')
+                    == tokenizer.tokenize('데이터는 데이터센터의 파스타는맛있어')):
+                raise ValueError("loaded {}.tokenize('데이터는 데이터센터의 파스타는맛있어') == {}".format(
+                    tokenizer.__class__.__name__, loaded.tokenize('데이터는 데이터센터의 파스타는맛있어')))
+        # loading time does not depend on dictionary size. compiled tables are used without tries
+        if not (loaded._l_trie is None and loaded._r_trie is None and loaded.lmax == maxlr_tokenizer.lmax):
+            raise ValueError("loaded MaxLRScoreTokenizer built tries or wrong lmax = {}".format(loaded.lmax))
+
     print('all tokenizer tests have been successed\n')
 
 def word_extractor_test(corpus_path):
@@ -127,6 +326,14 @@ def noun_extractor_test(corpus_path):
     for word in topwords:
         print('word = {}, score = {}'.format(word, noun_scores[word].score))
 
+    # eojeols counted in parallel make same vocabulary, lrgraph and nouns
+    parallel = LRNounExtractor(verbose=False)
+    parallel_noun_scores = parallel.train_extract(corpus, n_jobs=2, chunk_size=100)
+    if not (parallel.words == noun_extractor.words and parallel.lrgraph._lr == noun_extractor.lrgraph._lr):
+        raise ValueError('LRNounExtractor.train(n_jobs=2) built different vocabulary or lrgraph with n_jobs=1')
+    if not (parallel_noun_scores == noun_scores):
+        raise ValueError('LRNounExtractor.train_extract(n_jobs=2) extracted different nouns with n_jobs=1')
+
     # NewsNounExtractor
     print('\nNewsNounExtractor test\n{}'.format('-'*40))
     newsnoun_extractor = NewsNounExtractor()
@@ -136,6 +343,13 @@ def noun_extractor_test(corpus_path):
     topwords = sorted(newsnoun_scores, key=lambda x: -newsnoun_scores[x].score * newsnoun_scores[x].frequency)[:20]
     for word in topwords:
         print('word = {}, score = {}'.format(word, newsnoun_scores[word].score))
+
+    # statistics table is same with lrgraph
+    for l, rdict in newsnoun_extractor.lrgraph.items():
+        frequency = sum(rdict.values())
+        statistics = (newsnoun_extractor.predict(l).frequency, newsnoun_extractor._l_statistic(l, 'n_nonempty_r'))
+        if not (statistics == (frequency, frequency - rdict.get('', 0))):
+            raise ValueError('NewsNounExtractor statistics of {} = {}'.format(l, statistics))
     print('noun extractor test has been done\n\n')
 
     # LRNounExtractor_v2
@@ -148,6 +362,66 @@ def noun_extractor_test(corpus_path):
     topwords = sorted(noun_scores_v2, key=lambda x: -noun_scores_v2[x].score * noun_scores_v2[x].frequency)[:20]
     for word in topwords:
         print('word = {}, score = {}'.format(word, noun_scores_v2[word].score))
+
+    # parallel batch prediction makes same nouns and same remained lrgraph
+    serial = LRNounExtractor_v2(verbose=False, n_jobs=1)
+    parallel = LRNounExtractor_v2(verbose=False, n_jobs=2)
+    serial.train(corpus)
+    parallel.train(corpus)
+    serial_nouns = serial.extract(reset_lrgraph=False)
+    parallel_nouns = parallel.extract(reset_lrgraph=False)
+    if not (serial_nouns == parallel_nouns and serial.lrgraph._lr == parallel.lrgraph._lr):
+        raise ValueError('LRNounExtractor_v2(n_jobs=2) extracted different nouns with n_jobs=1')
+
+    # matrix scoring is same with predict
+    serial.lrgraph.reset_lrgraph()
+    words = list(serial.lrgraph._lr)
+    if not (serial._score_candidates(words) == [serial.predict(word) for word in words]):
+        raise ValueError('LRNounExtractor_v2._score_candidates(words) is different with predict(word)')
+
+    # compound engine is same with decompose_compound
+    from soynlp.noun._noun_ver2 import _find_compounds
+    words = [word for word in words if len(word) >= 3]
+    compounds = _find_compounds(words, serial._compound_decomposer.scores, serial._pos_features)
+    for word in words:
+        if not (compounds.get(word, (word,)) == serial.decompose_compound(word)):
+            raise ValueError('_find_compounds decomposed {} into {}, but decompose_compound returned {}'.format(
+                word, compounds.get(word), serial.decompose_compound(word)))
+
+    # incremental update is same with training all sentences
+    sents = list(corpus)
+    incremental = LRNounExtractor_v2(verbose=False)
+    prev_nouns = incremental.train_extract(sents[:len(sents) // 2])
+    delta = incremental.update(sents[len(sents) // 2:])
+    nouns = LRNounExtractor_v2(verbose=False).train_extract(sents)
+    if not (incremental._nouns == nouns):
+        raise ValueError('LRNounExtractor_v2.update(sents) extracted different nouns with train_extract')
+    updated_nouns = {noun:score for noun, score in prev_nouns.items() if not (noun in delta.removed)}
+    updated_nouns.update(delta.added)
+    updated_nouns.update(delta.updated)
+    if not (updated_nouns == nouns):
+        raise ValueError('LRNounExtractor_v2.update(sents) returned wrong delta')
+
+    # loaded extractor extracts same nouns without training
+    with tempfile.TemporaryDirectory() as dirname:
+        path = '{}/noun_extractor_v2.pkl'.format(dirname)
+        incremental.save(path)
+        loaded = LRNounExtractor_v2(verbose=False, n_jobs=2)
+        loaded.load(path)
+        with open(path, 'r+b') as f:
+            f.write(b'SOYNLPNX\x02')
+        try:
+            LRNounExtractor_v2(verbose=False).load(path)
+            version_checked = False
+        except ValueError:
+            version_checked = True
+    if not version_checked:
+        raise ValueError('LRNounExtractor_v2.load(path) loaded the file of other version')
+    if not (loaded.extract(min_noun_score=0.5) == incremental.extract(min_noun_score=0.5)):
+        raise ValueError('LRNounExtractor_v2.load(path).extract() is different with saved extractor')
+    if not (loaded.verbose == False and loaded.n_jobs == 2):
+        raise ValueError('LRNounExtractor_v2.load(path) changed verbose={}, n_jobs={}'.format(
+            loaded.verbose, loaded.n_jobs))
     print('noun extractor test has been done\n\n')
 
 def pos_tagger_test():
@@ -0,0 +1,222 @@
+# -*- encoding:utf8 -*-
+
+"""Throughput, latency and model memory benchmark of tokenizers.
+
+Score tables are built with WordExtractor from the corpus, and every tokenizer
+tokenizes the same sentences. The report is written as JSON.
+
+Usage
+
+    python tokenizer_benchmark.py --data_dir ../data --output benchmark.json
+    python tokenizer_benchmark.py --max_sents 5000 --tokenizers MaxScoreTokenizer LTokenizer
+"""
+
+import argparse
+from collections import Counter
+import fnmatch
+import glob
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+sys.path.append('../')
+
+import numpy as np
+
+import soynlp
+from soynlp.tokenizer import CompiledScoreTable
+from soynlp.tokenizer import LTokenizer
+from soynlp.tokenizer import MaxLRScoreTokenizer
+from soynlp.tokenizer import MaxScoreTokenizer
+from soynlp.tokenizer import NounLMatchTokenizer
+from soynlp.tokenizer import NounMatchTokenizer
+from soynlp.tokenizer import RegexTokenizer
+from soynlp.tokenizer import load_tokenizer
+from soynlp.utils import get_process_memory
+from soynlp.word import WordExtractor
+
+
+def log(message):
+    # stdout is reserved for JSON report
+    sys.stderr.write('[Tokenizer Benchmark] {}\n'.format(message))
+
+def load_sentences(paths, max_sents=0):
+    """Each line is 'sentence' or 'sentence\\tlabel'"""
+    sents = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                sent = line.split('\t')[0].strip()
+                if sent:
+                    sents.append(sent)
+    if max_sents > 0:
+        sents = sents[:max_sents]
+    return sents
+
+def build_tables(sents, min_score, num_r):
+    word_extractor = WordExtractor(verbose_points=0)
+    word_extractor.train(sents)
+    cohesions = word_extractor.all_cohesion_scores()
+    scores = {word: score[0] for word, score in cohesions.items() if score[0] > 0}
+    nouns = {word: score for word, score in scores.items() if score >= min_score}
+
+    # R dictionary of MaxLRScoreTokenizer from frequent R parts of L-tokenized eojeols
+    ltokenizer = LTokenizer(scores)
+    counter = Counter(r for sent in sents for _, r in ltokenizer.tokenize(sent, flatten=False)
+                      if 0 < len(r) <= 3)
+    most_common = counter.most_common(num_r)
+    max_count = most_common[0][1] if most_common else 1
+    Dr = {r: count / max_count for r, count in most_common}
+
+    return scores, nouns, Dr
+
+def tokenizer_factories(scores, nouns, Dr, compiled):
+    def table(d):
+        # copy in factory, so the measured memory includes the table
+        return CompiledScoreTable.from_dict(d) if compiled else dict(d)
+
+    return [
+        ('RegexTokenizer', lambda: RegexTokenizer()),
+        ('LTokenizer', lambda: LTokenizer(scores=table(scores))),
+        ('MaxScoreTokenizer', lambda: MaxScoreTokenizer(scores=table(scores))),
+        ('MaxLRScoreTokenizer', lambda: MaxLRScoreTokenizer(Dl=table(nouns), Dr=table(Dr))),
+        ('NounLMatchTokenizer', lambda: NounLMatchTokenizer(set(nouns))),
+        ('NounMatchTokenizer', lambda: NounMatchTokenizer(table(nouns)))
+    ]
+
+def measure_model(factory):
+    tracemalloc.start()
+    begin = time.perf_counter()
+    tokenizer = factory()
+    build_time = time.perf_counter() - begin
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return tokenizer, build_time, memory
+
+def measure_load(tokenizer):
+    """Seconds of load_tokenizer. It is None if the tokenizer has no save"""
+    if not hasattr(tokenizer, 'save'):
+        return None
+    with tempfile.TemporaryDirectory() as dirname:
+        path = os.path.join(dirname, 'tokenizer.model')
+        tokenizer.save(path)
+        begin = time.perf_counter()
+        loaded = load_tokenizer(path)
+        load_time = time.perf_counter() - begin
+        del loaded
+    return load_time
+
+def measure_tokenize(tokenizer, sents, repeat):
+    latencies = np.zeros(len(sents) * repeat)
+    num_tokens = 0
+    i = 0
+    for _ in range(repeat):
+        for sent in sents:
+            begin = time.perf_counter()
+            tokens = tokenizer.tokenize(sent)
+            latencies[i] = time.perf_counter() - begin
+            num_tokens += len(tokens)
+            i += 1
+    total = latencies.sum()
+    return {
+        'num_tokens': num_tokens,
+        'elapsed_seconds': float(total),
+        'tokens_per_second': num_tokens / total if total > 0 else 0,
+        'sentences_per_second': i / total if total > 0 else 0,
+        'latency_p50_ms': float(np.percentile(latencies, 50) * 1000),
+        'latency_p99_ms': float(np.percentile(latencies, 99) * 1000),
+        'latency_max_ms': float(latencies.max() * 1000)
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data_dir', type=str, default='../data',
+        help='Directory of corpus text files')
+    parser.add_argument('--pattern', type=str, default='*.txt',
+        help='File name pattern of corpus in data_dir')
+    parser.add_argument('--exclude', type=str, default='*_norm.txt',
+        help='File name pattern excluded from corpus. Default skips the normalized copies of raw corpus')
+    parser.add_argument('--max_sents', type=int, default=0,
+        help='Number of sentences. 0 means all')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--min_noun_score', type=float, default=0.3,
+        help='Minimum cohesion of nouns for noun tokenizers and L dictionary of MaxLRScoreTokenizer')
+    parser.add_argument('--num_r', type=int, default=100,
+        help='Number of R parts of MaxLRScoreTokenizer')
+    parser.add_argument('--tokenizers', type=str, nargs='*', default=None,
+        help='Class names of tokenizers. Default is all')
+    parser.add_argument('--compiled', dest='compiled', action='store_true',
+        help='Use CompiledScoreTable as score tables')
+    parser.add_argument('--output', type=str, default='',
+        help='JSON report path. Default is stdout')
+
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.data_dir, args.pattern)))
+    if args.exclude:
+        paths = [p for p in paths if not fnmatch.fnmatch(os.path.basename(p), args.exclude)]
+    if not paths:
+        raise ValueError('No corpus file matches {}'.format(os.path.join(args.data_dir, args.pattern)))
+    sents = load_sentences(paths, args.max_sents)
+    log('loaded {} sentences from {} files'.format(len(sents), len(paths)))
+
+    begin = time.perf_counter()
+    scores, nouns, Dr = build_tables(sents, args.min_noun_score, args.num_r)
+    build_time = time.perf_counter() - begin
+    log('built {} word scores, {} nouns, {} R in {:.3f} sec'.format(
+        len(scores), len(nouns), len(Dr), build_time))
+
+    results = {}
+    for name, factory in tokenizer_factories(scores, nouns, Dr, args.compiled):
+        if args.tokenizers and not (name in args.tokenizers):
+            continue
+        tokenizer, model_build_time, model_memory = measure_model(factory)
+        result = {'model_build_seconds': model_build_time, 'model_memory_bytes': model_memory,
+                  'model_load_seconds': measure_load(tokenizer)}
+        result.update(measure_tokenize(tokenizer, sents, args.repeat))
+        results[name] = result
+        log('{}: {:.0f} tokens/sec, p50 {:.4f} ms, p99 {:.4f} ms, load {}'.format(
+            name, result['tokens_per_second'], result['latency_p50_ms'], result['latency_p99_ms'],
+            '-' if result['model_load_seconds'] is None else '{:.4f} sec'.format(result['model_load_seconds'])))
+        del tokenizer
+
+    report = {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'soynlp': soynlp.__version__,
+            'cpu_count': os.cpu_count()
+        },
+        'corpus': {
+            'files': [os.path.basename(path) for path in paths],
+            'num_sents': len(sents),
+            'num_eojeols': sum(len(sent.split()) for sent in sents),
+            'repeat': args.repeat
+        },
+        'build': {
+            'word_extractor_seconds': build_time,
+            'num_scores': len(scores),
+            'num_nouns': len(nouns),
+            'num_r': len(Dr),
+            'compiled': args.compiled
+        },
+        'process_memory_gb': get_process_memory(),
+        'tokenizers': results
+    }
+
+    report = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        dirname = os.path.dirname(args.output)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report)
+        log('report was written in {}'.format(args.output))
+    else:
+        print(report)
+
+if __name__ == '__main__':
+    main()